@@ -1,5 +1,11 @@
+import functools
 import math
-from typing import Dict, List, Optional, Tuple
+import sys
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from config import (
     BENCH_GAP,
@@ -12,65 +18,226 @@ from config import (
     SCREEN_WIDTH,
 )
 
+# Pointy-top hex spacing: neighbours are sqrt(3) * r apart horizontally, odd rows shift by half that.
+SQRT3 = math.sqrt(3)
+COL_STEP = HEX_RADIUS * SQRT3
+ODD_ROW_SHIFT = COL_STEP / 2
+ROW_STEP = HEX_RADIUS * 1.5
+
+
+class Side(IntEnum):
+    ENEMY = 0
+    FRIENDLY = 1
+    NEUTRAL = 2
+    BENCH = 3
+
+
+# Bitboard masks: tile (row, col) owns bit row * BOARD_COLS + col, bench rows included.
+ENEMY_MASK = (1 << (BOARD_ROWS_PER_SIDE * BOARD_COLS)) - 1
+FRIENDLY_MASK = ((1 << (BOARD_ROWS_PER_SIDE * 2 * BOARD_COLS)) - 1) & ~ENEMY_MASK
+BENCH_MASK = ((1 << ((BOARD_ROWS + BENCH_ROWS) * BOARD_COLS)) - 1) & ~((1 << (BOARD_ROWS * BOARD_COLS)) - 1)
+SIDE_MASKS = {Side.ENEMY: ENEMY_MASK, Side.FRIENDLY: FRIENDLY_MASK, Side.BENCH: BENCH_MASK}
+ROW_MASK = (1 << BOARD_COLS) - 1
+
+# Odd rows are shifted right by half a hex, so diagonal neighbours depend on row parity.
+EVEN_ROW_NEIGHBORS = ((-1, -1), (-1, 0), (0, -1), (0, 1), (1, -1), (1, 0))
+ODD_ROW_NEIGHBORS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1))
+
+# Side of the square cells BoardArrays buckets centers into for Z-order box queries, in pixels.
+ZORDER_CELL = HEX_RADIUS
+
+
+def _spread_bits(value: int) -> int:
+    # Plain & and << rather than augmented assignment, so integer arrays work too and are not modified.
+    value = value & 0xFFFF
+    value = (value | (value << 8)) & 0x00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F
+    value = (value | (value << 2)) & 0x33333333
+    value = (value | (value << 1)) & 0x55555555
+    return value
+
+
+def interleave_bits(row: int, col: int) -> int:
+    """Morton (Z-order) code: column bits on even positions, row bits on odd positions."""
+    return _spread_bits(col) | (_spread_bits(row) << 1)
+
 
 class HexTile:
+    __slots__ = ("row", "col", "id", "index", "bit", "center_x", "center_y", "is_bench", "side", "neighbors")
+
     def __init__(self, row: int, col: int, x: float, y: float, is_bench: bool = False) -> None:
         self.row = row
         self.col = col
+        # Interned once so tile-id dict lookups and comparisons stay cheap.
+        self.id = sys.intern(f"{row}-{col}")
+        # Position in the row-major tile list and the matching bitboard bit.
+        self.index = row * BOARD_COLS + col
+        self.bit = 1 << self.index
         self.center_x = x
         self.center_y = y
         self.is_bench = is_bench
         self.side = self._assign_side()
-
-    @property
-    def id(self) -> str:
-        return f"{self.row}-{self.col}"
+        # Indices of adjacent tiles, filled in by link_neighbors.
+        self.neighbors: Tuple[int, ...] = ()
 
     @property
     def center(self) -> Tuple[float, float]:
         return self.center_x, self.center_y
 
-    def _assign_side(self) -> str:
+    def _assign_side(self) -> Side:
         if self.is_bench:
-            return "bench"
+            return Side.BENCH
         if self.row < BOARD_ROWS_PER_SIDE:
-            return "enemy"
+            return Side.ENEMY
         if self.row < BOARD_ROWS_PER_SIDE * 2:
-            return "friendly"
-        return "neutral"
+            return Side.FRIENDLY
+        return Side.NEUTRAL
 
 
 def build_board() -> List[HexTile]:
     """Generate a compact hex board shared by server and client, centered on screen."""
-    tiles: List[HexTile] = []
+    # The layout depends only on config constants; tiles are shared, the list is the caller's own.
+    return list(load_board().tiles)
+
+
+def _build_tiles() -> Tuple[HexTile, ...]:
     r = HEX_RADIUS
     # Compute board footprint and center it horizontally; add a small top margin.
-    center_span_x = r * ((BOARD_COLS - 1) * 1.732 + 0.866)
+    center_span_x = (BOARD_COLS - 1) * COL_STEP + ODD_ROW_SHIFT
     total_width = center_span_x + 2 * r
     start_x = (SCREEN_WIDTH - total_width) / 2 + r
-    center_span_y = r * (1.5 * (BOARD_ROWS - 1))
-    bench_span_y = r * (1.5 * (BENCH_ROWS - 1)) if BENCH_ROWS > 0 else 0
+    center_span_y = ROW_STEP * (BOARD_ROWS - 1)
+    bench_span_y = ROW_STEP * (BENCH_ROWS - 1) if BENCH_ROWS > 0 else 0
     total_height = center_span_y + bench_span_y + BENCH_GAP + 2 * r
     start_y = max(80, (SCREEN_HEIGHT - total_height) / 2 + r)
-    for row in range(BOARD_ROWS):
-        for col in range(BOARD_COLS):
-            cx = start_x + col * (r * 1.732) + (0 if row % 2 == 0 else r * 0.866)
-            cy = start_y + row * (r * 1.5)
-            tiles.append(HexTile(row, col, cx, cy, False))
-    # Bench rows below the battlefield
-    bench_start_y = start_y + BOARD_ROWS * (r * 1.5) + BENCH_GAP
-    for bench_row in range(BENCH_ROWS):
-        global_row = BOARD_ROWS + bench_row
-        for col in range(BOARD_COLS):
-            cx = start_x + col * (r * 1.732) + (0 if global_row % 2 == 0 else r * 0.866)
-            cy = bench_start_y + bench_row * (r * 1.5)
-            tiles.append(HexTile(global_row, col, cx, cy, True))
-    return tiles
-
-
-def tile_lookup(tiles: List[HexTile]) -> Dict[str, HexTile]:
+    # Battlefield rows followed by the bench rows below it, laid out as one row-major grid.
+    board_rows = np.arange(BOARD_ROWS)
+    bench_rows = np.arange(BENCH_ROWS)
+    bench_start_y = start_y + BOARD_ROWS * ROW_STEP + BENCH_GAP
+    rows = np.concatenate([board_rows, BOARD_ROWS + bench_rows])
+    cols = np.arange(BOARD_COLS)
+    # Row-invariant terms are computed once per row and broadcast across the columns.
+    row_offset = np.where(rows % 2 == 0, 0.0, ODD_ROW_SHIFT)
+    row_y = np.concatenate([start_y + board_rows * ROW_STEP, bench_start_y + bench_rows * ROW_STEP])
+    cx = start_x + cols[None, :] * COL_STEP + row_offset[:, None]
+    cy = np.broadcast_to(row_y[:, None], cx.shape)
+    tiles = [
+        HexTile(row, col, x, y, row >= BOARD_ROWS)
+        for row, col, x, y in zip(
+            np.repeat(rows, BOARD_COLS).tolist(),
+            np.tile(cols, len(rows)).tolist(),
+            cx.ravel().tolist(),
+            cy.ravel().tolist(),
+        )
+    ]
+    link_neighbors(tiles)
+    return tuple(tiles)
+
+
+def link_neighbors(tiles: List[HexTile]) -> None:
+    """Precompute each tile's adjacent tile indices; the bench is not connected to the battlefield."""
+    for tile in tiles:
+        # Row bounds of the strip the tile belongs to, so out-of-strip offsets are never probed.
+        row_min, row_max = (BOARD_ROWS, BOARD_ROWS + BENCH_ROWS - 1) if tile.is_bench else (0, BOARD_ROWS - 1)
+        offsets = ODD_ROW_NEIGHBORS if tile.row % 2 else EVEN_ROW_NEIGHBORS
+        tile.neighbors = tuple(
+            (tile.row + dr) * BOARD_COLS + tile.col + dc
+            for dr, dc in offsets
+            if row_min <= tile.row + dr <= row_max and 0 <= tile.col + dc < BOARD_COLS
+        )
+
+
+@dataclass
+class BoardArrays:
+    """Struct-of-arrays view of the board for vectorized geometry queries."""
+
+    rows: np.ndarray
+    cols: np.ndarray
+    cx: np.ndarray
+    cy: np.ndarray
+    side_code: np.ndarray
+    # Whole-pixel copies of the centers for integer distance checks; screen coordinates fit in int16.
+    cx_i16: np.ndarray = field(init=False, repr=False)
+    cy_i16: np.ndarray = field(init=False, repr=False)
+    # Center indices sorted by the Morton code of their ZORDER_CELL cell, with the sorted codes and cells.
+    zorder: np.ndarray = field(init=False, repr=False)
+    zorder_codes: np.ndarray = field(init=False, repr=False)
+    cell_col: np.ndarray = field(init=False, repr=False)
+    cell_row: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.cx_i16 = np.rint(self.cx).astype(np.int16)
+        self.cy_i16 = np.rint(self.cy).astype(np.int16)
+        self.cell_col = np.maximum(self.cx_i16 // ZORDER_CELL, 0).astype(np.int64)
+        self.cell_row = np.maximum(self.cy_i16 // ZORDER_CELL, 0).astype(np.int64)
+        codes = interleave_bits(self.cell_row, self.cell_col)
+        self.zorder = np.argsort(codes, kind="stable")
+        self.zorder_codes = codes[self.zorder]
+
+    def in_cells(self, row_min: int, col_min: int, row_max: int, col_max: int) -> np.ndarray:
+        """Indices of the centers inside the inclusive cell box, bisecting the Morton-sorted codes."""
+        # Every code in the box lies between the codes of its two corners; the span also holds some outside it.
+        start = np.searchsorted(self.zorder_codes, interleave_bits(row_min, col_min), side="left")
+        end = np.searchsorted(self.zorder_codes, interleave_bits(row_max, col_max), side="right")
+        found = self.zorder[start:end]
+        rows = self.cell_row[found]
+        cols = self.cell_col[found]
+        return found[(rows >= row_min) & (rows <= row_max) & (cols >= col_min) & (cols <= col_max)]
+
+    def nearest(self, x: int, y: int) -> Tuple[int, float]:
+        """Index of the closest center to the pixel (x, y) and its distance, or (-1, inf) if none is near.
+
+        Only the 3x3 cells around the point are measured, so the answer is exact whenever the
+        closest center is within ZORDER_CELL pixels.
+        """
+        col = x // ZORDER_CELL
+        row = y // ZORDER_CELL
+        # Sorted back to row-major order so ties go to the lowest index, as in a full scan.
+        candidates = np.sort(self.in_cells(max(row - 1, 0), max(col - 1, 0), max(row + 1, 0), max(col + 1, 0)))
+        if not candidates.size:
+            return -1, math.inf
+        # Squared int16 differences overflow, so the differences are taken straight into int32.
+        dx = np.subtract(self.cx_i16[candidates], x, dtype=np.int32)
+        dy = np.subtract(self.cy_i16[candidates], y, dtype=np.int32)
+        dist_sq = dx * dx + dy * dy
+        best = int(np.argmin(dist_sq))
+        return int(candidates[best]), math.sqrt(dist_sq[best])
+
+
+def board_arrays(tiles: Sequence[HexTile]) -> BoardArrays:
+    count = len(tiles)
+    return BoardArrays(
+        rows=np.fromiter((t.row for t in tiles), dtype=np.int16, count=count),
+        cols=np.fromiter((t.col for t in tiles), dtype=np.int16, count=count),
+        cx=np.fromiter((t.center_x for t in tiles), dtype=np.float64, count=count),
+        cy=np.fromiter((t.center_y for t in tiles), dtype=np.float64, count=count),
+        side_code=np.fromiter((t.side for t in tiles), dtype=np.int8, count=count),
+    )
+
+
+@dataclass(frozen=True)
+class Board:
+    """The shared board with its lookup tables, built once; treat the dicts as read-only."""
+
+    tiles: Tuple[HexTile, ...]
+    by_id: Dict[str, HexTile]
+    by_rc: Dict[Tuple[int, int], HexTile]
+    arrays: BoardArrays
+
+
+@functools.lru_cache(maxsize=1)
+def load_board() -> Board:
+    tiles = _build_tiles()
+    return Board(tiles=tiles, by_id=tile_lookup(tiles), by_rc=tile_grid(tiles), arrays=board_arrays(tiles))
+
+
+def tile_lookup(tiles: Sequence[HexTile]) -> Dict[str, HexTile]:
     return {t.id: t for t in tiles}
 
 
-def find_tile(tiles: List[HexTile], row: int, col: int) -> Optional[HexTile]:
-    return next((t for t in tiles if t.row == row and t.col == col), None)
+def tile_grid(tiles: Sequence[HexTile]) -> Dict[Tuple[int, int], HexTile]:
+    return {(t.row, t.col): t for t in tiles}
+
+
+def find_tile(grid: Dict[Tuple[int, int], HexTile], row: int, col: int) -> Optional[HexTile]:
+    return grid.get((row, col))
@@ -1,3 +1,5 @@
+from typing import NamedTuple, Tuple
+
 SCREEN_WIDTH = 1420
 SCREEN_HEIGHT = 960
 
@@ -32,11 +34,25 @@ ACCEL_SECONDS = 10
 PLAYER_START_HEALTH = 20
 LOSS_HEALTH_PENALTY = 2
 
+
+class UnitStats(NamedTuple):
+    hp: int
+    dmg: int
+    range: int
+    speed: float
+    color: Tuple[int, int, int]
+    cost: int
+
+
 UNIT_STATS = {
-    "Vanguard": {"hp": 1500, "dmg": 10, "range": 60, "speed": 1.8, "color": (200, 90, 90), "cost": 1},
-    "Ranger": {"hp": 80, "dmg": 18, "range": 260, "speed": 2.2, "color": (90, 210, 140), "cost": 2},
-    "Mage": {"hp": 70, "dmg": 30, "range": 180, "speed": 1.6, "color": (120, 140, 230), "cost": 3},
+    "Vanguard": UnitStats(hp=1500, dmg=10, range=60, speed=1.8, color=(200, 90, 90), cost=1),
+    "Ranger": UnitStats(hp=80, dmg=18, range=260, speed=2.2, color=(90, 210, 140), cost=2),
+    "Mage": UnitStats(hp=70, dmg=30, range=180, speed=1.6, color=(120, 140, 230), cost=3),
 }
+# Squared attack ranges so range checks can compare squared distances without a sqrt.
+UNIT_RANGE_SQ = {name: float(stats.range) ** 2 for name, stats in UNIT_STATS.items()}
+# Flat cost table for the shop paths, which only ever need the price.
+UNIT_COST = {name: stats.cost for name, stats in UNIT_STATS.items()}
 
 # File names in assets/ used by the pygame 클라이언트. Missing files gracefully fall back to circles.
 UNIT_ART = {
@@ -1,16 +1,17 @@
 import argparse
-import json
 import math
-import select
 import socket
+from collections import OrderedDict
+from dataclasses import replace
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 import pygame
 import numpy as np
 import cv2
+import msgpack
 
-from board import HexTile, build_board
+from board import HexTile, Side, load_board
 from config import (
     BG_COLOR,
     BENCH_TILE_COLOR,
@@ -24,6 +25,7 @@ from config import (
     UNIT_ART,
     UNIT_STATS,
 )
+from network import HEADER, decode_message, encode_message
 
 
 PLAYER_COLORS = [
@@ -41,38 +43,68 @@ ATTACK_FLASH_TICKS = 10
 SHOP_CARD_W = 180
 SHOP_CARD_H = 140
 SHOP_CARD_MARGIN = 16
+TEXT_CACHE_SIZE = 512
+PICK_CELL_SIZE = 48
+RECV_SIZE = 65536
+BUFFER_COMPACT_SIZE = 4096
 SHOP_ICON_SIZE = (160, 110)
+SHOP_CARD_COLOR = (54, 44, 70)
+SHOP_CARD_HOVER_COLOR = (68, 52, 90)
+SHOP_CARD_BORDER_COLOR = (160, 100, 200)
+SHOP_NAME_COLOR = (240, 240, 240)
+SHOP_COST_COLOR = (240, 210, 120)
+SHOP_COIN_COLOR = (200, 170, 70)
+READY_ROW_COLOR = (160, 240, 160)
+WAITING_ROW_COLOR = (200, 200, 200)
 BENCH_ICON_SIZE = (60, 60)
+# Pointy-top hex corner offsets from a tile center, computed once instead of per tile per frame.
+HEX_CORNER_OFFSETS = [
+    (HEX_RADIUS * math.cos(math.radians(60 * i - 30)), HEX_RADIUS * math.sin(math.radians(60 * i - 30)))
+    for i in range(6)
+]
+
+# Cache sentinel: a missing asset is cached as None, so absence needs its own marker.
+_MISS = object()
 
 
 class AssetCache:
     def __init__(self) -> None:
         self.base = Path(__file__).resolve().parent.parent / "assets"
-        self.cache: Dict[str, Optional[pygame.Surface]] = {}
+        # Keyed by (unit_type, mode, size, smooth, flipped).
+        self.cache: Dict[Tuple[str, str, Tuple[int, int], bool, bool], Optional[pygame.Surface]] = {}
         self.raw_cache: Dict[str, Optional[pygame.Surface]] = {}
 
-    def get_sprite(self, unit_type: str, mode: str) -> Optional[pygame.Surface]:
+    def get_sprite(self, unit_type: str, mode: str, flipped: bool = False) -> Optional[pygame.Surface]:
         # Slightly larger in-game sprites while keeping aspect ratio.
-        return self.get_sprite_scaled(unit_type, mode, (84, 84) if mode == "idle" else (90, 90))
-
-    def get_sprite_scaled(self, unit_type: str, mode: str, size: Tuple[int, int]) -> Optional[pygame.Surface]:
-        key = f"{unit_type}:{mode}:{size[0]}x{size[1]}"
-        if key in self.cache:
-            return self.cache[key]
-        filename = UNIT_ART.get(unit_type, {}).get(mode)
-        sprite = self._load_scaled(filename, size)
+        return self.get_sprite_scaled(unit_type, mode, (84, 84) if mode == "idle" else (90, 90), flipped=flipped)
+
+    def get_sprite_scaled(
+        self, unit_type: str, mode: str, size: Tuple[int, int], smooth: bool = True, flipped: bool = False
+    ) -> Optional[pygame.Surface]:
+        key = (unit_type, mode, size, smooth, flipped)
+        sprite = self.cache.get(key, _MISS)
+        if sprite is not _MISS:
+            return sprite
+        if flipped:
+            # Mirrored variants are derived once from the cached upright sprite, never per frame.
+            upright = self.get_sprite_scaled(unit_type, mode, size, smooth)
+            sprite = pygame.transform.flip(upright, True, False) if upright else None
+        else:
+            filename = UNIT_ART.get(unit_type, {}).get(mode)
+            sprite = self._load_scaled(filename, size, smooth)
         self.cache[key] = sprite
         return sprite
 
     def get_icon(self, unit_type: str) -> Optional[pygame.Surface]:
         return self.get_icon_scaled(unit_type, (64, 64))
 
-    def get_icon_scaled(self, unit_type: str, size: Tuple[int, int]) -> Optional[pygame.Surface]:
-        key = f"{unit_type}:icon:{size[0]}x{size[1]}"
-        if key in self.cache:
-            return self.cache[key]
+    def get_icon_scaled(self, unit_type: str, size: Tuple[int, int], smooth: bool = True) -> Optional[pygame.Surface]:
+        key = (unit_type, "icon", size, smooth, False)
+        icon = self.cache.get(key, _MISS)
+        if icon is not _MISS:
+            return icon
         filename = UNIT_ART.get(unit_type, {}).get("icon")
-        icon = self._load_scaled(filename, size)
+        icon = self._load_scaled(filename, size, smooth)
         self.cache[key] = icon
         return icon
 
@@ -92,7 +124,9 @@ class AssetCache:
         self.raw_cache[filename] = img
         return img
 
-    def _load_scaled(self, filename: Optional[str], size: Tuple[int, int]) -> Optional[pygame.Surface]:
+    def _load_scaled(
+        self, filename: Optional[str], size: Tuple[int, int], smooth: bool = True
+    ) -> Optional[pygame.Surface]:
         raw = self._load_raw(filename)
         if raw is None:
             return None
@@ -102,6 +136,9 @@ class AssetCache:
         scale = min(target_w / orig_w, target_h / orig_h)
         scaled_w = max(1, int(orig_w * scale))
         scaled_h = max(1, int(orig_h * scale))
+        if not smooth:
+            # Nearest-neighbour keeps the pixel art crisp and skips smoothscale's per-pixel filtering.
+            return pygame.transform.scale(raw, (scaled_w, scaled_h))
         return pygame.transform.smoothscale(raw, (scaled_w, scaled_h))
 
     def _load_image(self, filename: Optional[str], scale: Tuple[int, int]) -> Optional[pygame.Surface]:
@@ -114,12 +151,18 @@ class NetworkClient:
         self.host = host
         self.port = port
         self.sock: Optional[socket.socket] = None
-        self.buffer = b""
+        # Received bytes accumulate in place; _cursor marks the start of the first unparsed frame.
+        self.buffer = bytearray()
+        self._cursor = 0
+        # Encoded commands not yet accepted by the kernel; drained without blocking the frame loop.
+        self._outbuf = bytearray()
         self.connected = False
 
     def connect(self) -> None:
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setblocking(False)
+        # Commands are tiny and latency-sensitive (clicks), so don't let Nagle hold them back.
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         try:
             self.sock.connect((self.host, self.port))
         except BlockingIOError:
@@ -134,38 +177,62 @@ class NetworkClient:
         if not self.connected or not self.sock:
             return []
         messages: List[Dict] = []
-        readable, _, _ = select.select([self.sock], [], [], 0)
-        if readable:
-            try:
-                data = self.sock.recv(4096)
-            except BlockingIOError:
-                data = b""
-            if not data:
-                self.connected = False
-                return []
-            self.buffer += data
-            while b"\n" in self.buffer:
-                line, self.buffer = self.buffer.split(b"\n", 1)
-                if not line:
-                    continue
+        self.flush()
+        # The socket is non-blocking, so an empty receive queue just raises instead of needing select().
+        try:
+            data = self.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return messages
+        if not data:
+            self.connected = False
+            return []
+        buffer = self.buffer
+        buffer.extend(data)
+        cursor = self._cursor
+        view = memoryview(buffer)
+        try:
+            # Frames are a 4-byte length header followed by that many msgpack bytes.
+            while len(buffer) - cursor >= HEADER.size:
+                (length,) = HEADER.unpack_from(buffer, cursor)
+                start = cursor + HEADER.size
+                end = start + length
+                if end > len(buffer):
+                    break
+                cursor = end
                 try:
-                    messages.append(json.loads(line.decode("utf-8")))
-                except json.JSONDecodeError:
+                    messages.append(decode_message(view[start:end]))
+                except (ValueError, msgpack.UnpackException):
                     continue
+        finally:
+            view.release()
+        # Drop consumed bytes only once enough have piled up, so most polls never shift the buffer.
+        if cursor == len(buffer) or cursor > BUFFER_COMPACT_SIZE:
+            del buffer[:cursor]
+            cursor = 0
+        self._cursor = cursor
         return messages
 
     def send(self, payload: Dict) -> None:
         if not self.connected or not self.sock:
             return
+        self._outbuf += encode_message(payload)
+        self.flush()
+
+    def flush(self) -> None:
+        if not self._outbuf or not self.connected or not self.sock:
+            return
         try:
-            data = (json.dumps(payload) + "\n").encode("utf-8")
-            self.sock.sendall(data)
+            sent = self.sock.send(self._outbuf)
+        except (BlockingIOError, InterruptedError):
+            return
         except (BrokenPipeError, ConnectionResetError):
             self.connected = False
+            return
+        del self._outbuf[:sent]
 
 
 class AutoBattlerClient:
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, host: str, port: int, video_background: bool = False) -> None:
         pygame.init()
         pygame.display.set_caption("Auto Battler Client")
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -173,18 +240,24 @@ class AutoBattlerClient:
         self.font = pygame.font.SysFont("arial", 20)
         self.small_font = pygame.font.SysFont("arial", 16)
         self.big_font = pygame.font.SysFont("arial", 28)
+        # SysFont looks the face up on disk, so each size is loaded once and reused.
+        self._fonts: Dict[int, pygame.font.Font] = {20: self.font, 16: self.small_font, 28: self.big_font}
+        # Most labels are identical from frame to frame; keep their rendered surfaces (LRU).
+        self._text_cache: "OrderedDict[Tuple[str, Tuple[int, int, int], int], pygame.Surface]" = OrderedDict()
 
         self.network = NetworkClient(host, port)
         self.network.connect()
 
-        self.tiles = build_board()
-        self.dragging_unit: Optional[str] = None
+        self.board = load_board()
+        self.tiles = list(self.board.tiles)
+        self.dragging_unit: Optional[int] = None
         self.drag_from_bench = False
         self.drag_pos = (0, 0)
 
         self.player_id: Optional[int] = None
         self.players: Dict[int, Dict] = {}
         self.units: List[Dict] = []
+        self._units_by_id: Dict[int, Dict] = {}
         self.phase = "placement"
         self.bullets: List[Dict] = []
         self.last_error: Optional[str] = None
@@ -193,6 +266,7 @@ class AutoBattlerClient:
         self.assets = AssetCache()
         self.current_match_id: Optional[int] = None
         self.is_flipped = False
+        self._render_xy = self._world_xy
         self.pairs: List[Dict] = []
         self.scene = "lobby"  # lobby | game
         self.timer = {"phase": "placement", "remaining": 0}
@@ -204,22 +278,46 @@ class AutoBattlerClient:
         self.match_button = pygame.Rect(SCREEN_WIDTH // 2 - 140, SCREEN_HEIGHT // 2 + 40, 280, 60)
         self.name_input_rect = pygame.Rect(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2 - 10, 260, 42)
         self.name_save_button = pygame.Rect(self.name_input_rect.right + 20, self.name_input_rect.y, 120, 42)
-        self.tile_map = {f"{t.row}-{t.col}": t for t in self.tiles}
-        board_tiles = [t for t in self.tiles if not t.is_bench]
-        self.board_min_y = min(t.center_y for t in board_tiles)
-        self.board_max_y = max(t.center_y for t in board_tiles)
-        self.board_min_x = min(t.center_x for t in board_tiles)
-        self.board_max_x = max(t.center_x for t in board_tiles)
+        self.tile_map = self.board.by_id
+        self.tile_colors = [self.tile_fill(t) for t in self.tiles]
+        # Bench layout is static: slot centers left to right.
+        self._bench_coords_sorted = [
+            (int(t.center_x), int(t.center_y)) for t in sorted((t for t in self.tiles if t.is_bench), key=lambda t: t.col)
+        ]
+        arrays = self.board.arrays
+        on_board = arrays.side_code != Side.BENCH
+        board_cx = arrays.cx[on_board]
+        board_cy = arrays.cy[on_board]
+        self.board_min_y = float(board_cy.min())
+        self.board_max_y = float(board_cy.max())
+        self.board_min_x = float(board_cx.min())
+        self.board_max_x = float(board_cx.max())
         self.board_mid_x = (self.board_min_x + self.board_max_x) / 2.0
         self.board_mid_y = (self.board_min_y + self.board_max_y) / 2.0
         self.depth_min_y = self.board_min_y
-        self.depth_max_y = max(t.center_y for t in self.tiles)
+        self.depth_max_y = float(arrays.cy.max())
         self.setup_camera()
+        # The camera is fixed, so tile centers are projected to screen space once for cursor picking.
+        # Projected centers are whole pixels, so the int16 copies BoardArrays keeps for them are exact.
+        screen_x, screen_y = self.project_points(self.board.arrays.cx, self.board.arrays.cy)
+        self.screen_tile_arrays = replace(self.board.arrays, cx=screen_x, cy=screen_y)
+        # Tile geometry and colours never change, so the whole tile layer is rasterized once.
+        self._board_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA).convert_alpha()
+        self.render_tiles(self._board_surface)
+        # What an empty game frame looks like, used to erase last frame's sprites under dirty-rect updates.
+        self._game_background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self._game_background.fill(BG_COLOR)
+        self._game_background.blit(self._board_surface, (0, 0))
+        self._dirty: List[pygame.Rect] = []
+        self._prev_dirty: List[pygame.Rect] = []
+        self._drawn_scene: Optional[str] = None
         self.shop_slots = self.build_shop()
+        self._lobby_bg = self.render_lobby_background()
+        self._lobby_title = self._get_font(38).render("Auto Battler Lobby", True, (240, 240, 255))
         
-        # Load video background
+        # Load video background; opt-in, since a moving background forces a full repaint every frame.
         video_path = self.assets.base / "background.mp4"
-        if video_path.exists():
+        if video_background and video_path.exists():
             self.video_cap = cv2.VideoCapture(str(video_path))
             self.video_frame = None
         else:
@@ -229,6 +327,12 @@ class AutoBattlerClient:
         # Toggle for projecting video onto 3D ground plane
         self.project_video_on_ground = False
 
+        # Screen-space hit-test index over the local player's units, built lazily per state message.
+        self._board_units_sorted: List[Dict] = []
+        self._bench_units_sorted: List[Dict] = []
+        self._bullet_screen: Tuple[np.ndarray, np.ndarray] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._pick_index: Optional[Tuple[Dict[Tuple[int, int], List[Tuple[int, int, int, int]]], List[Tuple[int, int, int]]]] = None
+
     def build_shop(self) -> List[Dict]:
         slots: List[Dict] = []
         bench_tiles = [t for t in self.tiles if t.is_bench]
@@ -248,9 +352,48 @@ class AutoBattlerClient:
                 SHOP_CARD_W,
                 SHOP_CARD_H,
             )
-            slots.append({"type": utype, "rect": rect})
+            slots.append(
+                {
+                    "type": utype,
+                    "rect": rect,
+                    "surf_idle": self.render_shop_card(utype, rect.size, hovered=False),
+                    "surf_hover": self.render_shop_card(utype, rect.size, hovered=True),
+                }
+            )
         return slots
 
+    def render_shop_card(self, unit_name: str, size: Tuple[int, int], hovered: bool) -> pygame.Surface:
+        """Draw a complete shop card (frame, icon, name, cost) onto its own surface."""
+        card = pygame.Surface(size, pygame.SRCALPHA)
+        rect = card.get_rect()
+        cost = UNIT_STATS[unit_name].cost
+
+        base_color = SHOP_CARD_HOVER_COLOR if hovered else SHOP_CARD_COLOR
+        pygame.draw.rect(card, base_color, rect, border_radius=8)
+        pygame.draw.rect(card, SHOP_CARD_BORDER_COLOR, rect, width=2, border_radius=8)
+
+        icon_area = pygame.Rect(rect.x + 10, rect.y + 8, rect.width - 20, rect.height - 52)
+        icon = self.assets.get_icon_scaled(unit_name, (icon_area.width, icon_area.height), smooth=False)
+        if icon:
+            icon_rect = icon.get_rect(center=icon_area.center)
+            card.blit(icon, icon_rect)
+        else:
+            color = UNIT_STATS[unit_name].color
+            pygame.draw.rect(card, color, icon_area, border_radius=8)
+
+        # Name and cost bar
+        name_surf = self.font.render(unit_name, True, SHOP_NAME_COLOR)
+        name_rect = name_surf.get_rect()
+        name_rect.midleft = (rect.x + 10, rect.bottom - 18)
+        card.blit(name_surf, name_rect)
+
+        cost_text = self.font.render(str(cost), True, SHOP_COST_COLOR)
+        coin_x = rect.right - 26
+        coin_y = rect.bottom - 20
+        pygame.draw.circle(card, SHOP_COIN_COLOR, (coin_x, coin_y), 8)
+        card.blit(cost_text, (coin_x + 12, coin_y - cost_text.get_height() // 2))
+        return card
+
     # --- Networking ---
     def handle_message(self, msg: Dict) -> None:
         msg_type = msg.get("type")
@@ -266,18 +409,28 @@ class AutoBattlerClient:
                     "gold": self.gold,
                 }
                 self.name_input = f"Player{self.player_id + 1}"
+            self.refresh_unit_views()
         elif msg_type == "state":
-            self.phase = msg.get("phase", self.phase)
             self.units = msg.get("units", [])
-            self.bullets = msg.get("bullets", [])
-            self.server_tick = msg.get("tick", self.server_tick)
+            self._units_by_id = {u["id"]: u for u in self.units}
             self.pairs = msg.get("pairs", [])
             self.store_players(msg.get("players", []))
-            if "timers" in msg:
-                self.timer = msg["timers"]
-            if "round" in msg:
-                self.round_number = msg["round"]
-            self.update_orientation()
+            self.apply_state(msg)
+        elif msg_type == "state_delta":
+            # Patch the last full state: only changed unit fields and removed ids are sent.
+            units = self._units_by_id
+            for unit_id in msg.get("removed", []):
+                units.pop(unit_id, None)
+            for change in msg.get("changes", []):
+                unit = units.get(change["id"])
+                if unit is None:
+                    units[change["id"]] = change
+                else:
+                    unit.update(change)
+            self.units = list(units.values())
+            if "players" in msg:
+                self.store_players(msg["players"])
+            self.apply_state(msg)
         elif msg_type == "lobby":
             self.store_players(msg.get("players", []))
             self.phase = msg.get("phase", self.phase)
@@ -288,6 +441,18 @@ class AutoBattlerClient:
         elif msg_type == "error":
             self.last_error = msg.get("message")
 
+    def apply_state(self, msg: Dict) -> None:
+        self.phase = msg.get("phase", self.phase)
+        self.bullets = msg.get("bullets", [])
+        self.server_tick = msg.get("tick", self.server_tick)
+        if "timers" in msg:
+            self.timer = msg["timers"]
+        if "round" in msg:
+            self.round_number = msg["round"]
+        self.update_orientation()
+        self.refresh_unit_views()
+        self.refresh_bullets()
+
     def store_players(self, players: List[Dict]) -> None:
         parsed = {}
         for player in players:
@@ -304,22 +469,60 @@ class AutoBattlerClient:
         else:
             self.gold = 0
 
+    def refresh_unit_views(self) -> None:
+        """Filter and sort the units once per state message; frames render far more often."""
+        board_units = sorted(
+            [u for u in self.units if u.get("status") == "board" and u.get("hp", 0) > 0],
+            key=lambda u: u.get("y", 0),
+        )
+        if self.player_id is not None:
+            if self.phase != "combat":
+                board_units = [u for u in board_units if u.get("owner") == self.player_id]
+            else:
+                board_units = [
+                    u
+                    for u in board_units
+                    if u.get("owner") == self.player_id
+                    or (self.current_match_id is not None and u.get("match_id") == self.current_match_id)
+                ]
+        self._board_units_sorted = board_units
+        self._bench_units_sorted = sorted(
+            [u for u in self.units if u.get("owner") == self.player_id and u.get("status") == "bench"],
+            key=lambda u: u["id"],
+        )
+        self._pick_index = None
+
+    def refresh_bullets(self) -> None:
+        """Filter, mirror and project the visible bullets in one vectorized pass per state message."""
+        xs = np.array([float(b.get("x", 0)) for b in self.bullets], dtype=np.float64)
+        ys = np.array([float(b.get("y", 0)) for b in self.bullets], dtype=np.float64)
+        keep = np.array([b.get("visible", True) for b in self.bullets], dtype=bool)
+        if self.phase == "combat" and self.current_match_id is not None:
+            keep &= np.array([b.get("match_id") == self.current_match_id for b in self.bullets], dtype=bool)
+        xs = xs[keep]
+        ys = ys[keep]
+        if self.player_id is not None and self.is_flipped:
+            xs = self.board_mid_x - (xs - self.board_mid_x)
+            ys = self.board_mid_y - (ys - self.board_mid_y)
+        self._bullet_screen = self.project_points(xs, ys)
+
     def update_orientation(self) -> None:
         self.current_match_id = None
         self.is_flipped = False
-        if self.player_id is None or self.phase != "combat":
-            return
-        for pair in self.pairs:
-            bottom = pair.get("bottom")
-            top = pair.get("top")
-            if bottom == self.player_id:
-                self.current_match_id = pair.get("match_id")
-                self.is_flipped = False
-                return
-            if top == self.player_id:
-                self.current_match_id = pair.get("match_id")
-                self.is_flipped = True
-                return
+        if self.player_id is not None and self.phase == "combat":
+            for pair in self.pairs:
+                bottom = pair.get("bottom")
+                top = pair.get("top")
+                if bottom == self.player_id:
+                    self.current_match_id = pair.get("match_id")
+                    self.is_flipped = False
+                    break
+                if top == self.player_id:
+                    self.current_match_id = pair.get("match_id")
+                    self.is_flipped = True
+                    break
+        # Pick the world -> view mapping once here instead of branching on it per unit per frame.
+        self._render_xy = self._mirror_xy if self.is_flipped else self._world_xy
 
     def setup_camera(self) -> None:
         # Define Camera (Eye) and Target (At)
@@ -424,58 +627,58 @@ class AutoBattlerClient:
             
         return int(res[0]), int(res[1])
 
+    def project_points(self, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized project_point: screen-space x and y as integer arrays."""
+        vecs = np.empty((len(xs), 4), dtype=np.float32)
+        vecs[:, 0] = xs
+        vecs[:, 1] = -np.asarray(ys)
+        vecs[:, 2] = 0
+        vecs[:, 3] = 1.0
+        res = vecs @ self.vp_matrix.T
+        w = res[:, 3:4]
+        res = np.divide(res, w, out=res, where=w != 0)
+        return res[:, 0].astype(np.int64), res[:, 1].astype(np.int64)
+
     # --- UI Helpers ---
     def bench_slots(self, bench_count: int) -> List[Tuple[int, int]]:
-        bench_tiles = sorted([t for t in self.tiles if t.is_bench], key=lambda t: t.col)
-        if bench_tiles:
-            coords = [(int(t.center_x), int(t.center_y)) for t in bench_tiles]
-            # repeat pattern if more units than tiles
-            if bench_count > len(coords):
-                coords = (coords * ((bench_count // len(coords)) + 1))[:bench_count]
-            return coords[:bench_count]
-        base_x = 120
-        base_y = SCREEN_HEIGHT - 150
-        spacing = 80
-        return [(base_x + i * spacing, base_y) for i in range(bench_count)]
+        coords = self._bench_coords_sorted
+        if not coords:
+            base_x = 120
+            base_y = SCREEN_HEIGHT - 150
+            spacing = 80
+            return [(base_x + i * spacing, base_y) for i in range(bench_count)]
+        # repeat pattern if more units than tiles
+        if bench_count > len(coords):
+            coords = (coords * ((bench_count // len(coords)) + 1))[:bench_count]
+        return coords[:bench_count]
 
     def nearest_tile(self, pos: Tuple[int, int]) -> Tuple[Optional[HexTile], float]:
-        px, py = pos
-        best_tile = None
-        best_dist = float("inf")
-        for tile in self.tiles:
-            tx, ty = self.project_point(tile.center_x, tile.center_y)
-            dist = math.hypot(tx - px, ty - py)
-            if dist < best_dist:
-                best_dist = dist
-                best_tile = tile
-        return best_tile, best_dist
+        idx, dist = self.screen_tile_arrays.nearest(*pos)
+        return (self.tiles[idx] if idx >= 0 else None), dist
 
     def get_unit_color(self, unit: Dict) -> Tuple[int, int, int]:
         owner = int(unit.get("owner", 0))
         return PLAYER_COLORS[owner % len(PLAYER_COLORS)]
 
+    def tile_fill(self, tile: HexTile) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+        if tile.is_bench:
+            fill = BENCH_TILE_COLOR
+        else:
+            fill = FRIENDLY_TILE_COLOR if tile.side == Side.FRIENDLY else ENEMY_TILE_COLOR
+        # Darker color for the base/sides
+        base_color = (max(0, fill[0] - 40), max(0, fill[1] - 40), max(0, fill[2] - 40))
+        return fill, base_color
+
     def draw_tiles(self) -> None:
-        for tile in self.tiles:
-            points = []
-            r = HEX_RADIUS
-            for i in range(6):
-                angle_rad = math.radians(60 * i - 30)
-                points.append(
-                    (
-                        tile.center_x + r * math.cos(angle_rad),
-                        tile.center_y + r * math.sin(angle_rad),
-                    )
-                )
-            if tile.is_bench:
-                fill = BENCH_TILE_COLOR
-            else:
-                fill = FRIENDLY_TILE_COLOR if tile.side == "friendly" else ENEMY_TILE_COLOR
+        self.screen.blit(self._board_surface, (0, 0))
+
+    def render_tiles(self, surface: pygame.Surface) -> None:
+        for tile, (fill, base_color) in zip(self.tiles, self.tile_colors):
+            points = [(tile.center_x + dx, tile.center_y + dy) for dx, dy in HEX_CORNER_OFFSETS]
             proj_points = [self.project_point(px, py) for px, py in points]
             
             # Thickness logic
             thickness = 10
-            # Darker color for the base/sides
-            base_color = (max(0, fill[0] - 40), max(0, fill[1] - 40), max(0, fill[2] - 40))
             
             # Base points (shifted down in screen Y)
             base_points = [(x, y + thickness) for x, y in proj_points]
@@ -489,111 +692,97 @@ class AutoBattlerClient:
                 p2 = proj_points[(i + 1) % 6]
                 b1 = base_points[i]
                 b2 = base_points[(i + 1) % 6]
-                pygame.draw.polygon(self.screen, base_color, [p1, p2, b2, b1])
+                pygame.draw.polygon(surface, base_color, [p1, p2, b2, b1])
             
             # Draw top
-            pygame.draw.polygon(self.screen, fill, proj_points)
-            pygame.draw.polygon(self.screen, (30, 30, 40), proj_points, 2)
+            pygame.draw.polygon(surface, fill, proj_points)
+            pygame.draw.polygon(surface, (30, 30, 40), proj_points, 2)
 
     def draw_units(self) -> None:
         # Draw board units from authoritative state, with local mirroring if needed.
-        board_units = sorted(
-            [u for u in self.units if u.get("status") == "board" and u.get("hp", 0) > 0],
-            key=lambda u: u.get("y", 0),
-        )
-        if self.player_id is not None:
-            if self.phase != "combat":
-                board_units = [u for u in board_units if u.get("owner") == self.player_id]
-            else:
-                board_units = [
-                    u
-                    for u in board_units
-                    if u.get("owner") == self.player_id
-                    or (self.current_match_id is not None and u.get("match_id") == self.current_match_id)
-                ]
-        for unit in board_units:
-            if unit.get("status") != "board" or unit.get("hp", 0) <= 0:
-                continue
+        hp_back: List[Tuple[int, int, int, int]] = []
+        hp_fill: List[Tuple[int, int, float, int]] = []
+        for unit in self._board_units_sorted:
             x, y = self.render_pos(unit)
             is_attacking = self.phase == "combat" and self.server_tick - unit.get("attack_at", -999) < ATTACK_FLASH_TICKS
-            sprite = self.assets.get_sprite(unit["type"], "attack" if is_attacking else "idle")
+            # The top player sees the board turned around, so sprites face the other way too.
+            sprite = self.assets.get_sprite(unit["type"], "attack" if is_attacking else "idle", flipped=self.is_flipped)
             is_enemy = self.player_id is not None and unit.get("owner") != self.player_id
             # Soft shadow on the ground plane for depth
             shadow_w, shadow_h = 52, 18
             shadow = pygame.Surface((shadow_w, shadow_h), pygame.SRCALPHA)
             pygame.draw.ellipse(shadow, (0, 0, 0, 80), shadow.get_rect())
-            self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 16))
+            self._dirty.append(self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 16)))
             if sprite:
                 rect = sprite.get_rect(center=(x, y))
-                self.screen.blit(sprite, rect)
+                self._dirty.append(self.screen.blit(sprite, rect))
             else:
                 radius = 20
-                color = UNIT_STATS[unit["type"]]["color"]
-                pygame.draw.circle(self.screen, color, (x, y), radius)
+                color = UNIT_STATS[unit["type"]].color
+                self._dirty.append(pygame.draw.circle(self.screen, color, (x, y), radius))
             hp_ratio = max(unit["hp"], 0) / unit["max_hp"]
-            pygame.draw.rect(self.screen, (60, 0, 0), (x - 18, y - 30, 36, 6))
-            pygame.draw.rect(self.screen, (40, 200, 40), (x - 18, y - 30, 36 * hp_ratio, 6))
+            hp_back.append((x - 18, y - 30, 36, 6))
+            hp_fill.append((x - 18, y - 30, 36 * hp_ratio, 6))
+        # HP bars go in one pass after the sprites (pygame has no batched fill, so fill each rect directly).
+        fill = self.screen.fill
+        for back, front in zip(hp_back, hp_fill):
+            self._dirty.append(fill((60, 0, 0), back))
+            fill((40, 200, 40), front)
 
         # Draw bench units only for the local player.
         if self.player_id is None:
             return
-        bench_units = sorted(
-            [u for u in self.units if u.get("owner") == self.player_id and u.get("status") == "bench"],
-            key=lambda u: u["id"],
-        )
+        bench_units = self._bench_units_sorted
         slots = self.bench_slots(max(len(bench_units), 1))
         for idx, unit in enumerate(bench_units):
             base_x, base_y = slots[idx]
             x, y = self.project_point(base_x, base_y)
-            sprite = self.assets.get_sprite_scaled(unit["type"], "idle", BENCH_ICON_SIZE)
+            sprite = self.assets.get_sprite_scaled(unit["type"], "idle", BENCH_ICON_SIZE, smooth=False)
             shadow_w, shadow_h = 46, 16
             shadow = pygame.Surface((shadow_w, shadow_h), pygame.SRCALPHA)
             pygame.draw.ellipse(shadow, (0, 0, 0, 70), shadow.get_rect())
-            self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 12))
+            self._dirty.append(self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 12)))
             if sprite:
                 rect = sprite.get_rect(center=(x, y))
-                self.screen.blit(sprite, rect)
+                self._dirty.append(self.screen.blit(sprite, rect))
             else:
                 radius = 18
-                color = UNIT_STATS[unit["type"]]["color"]
-                pygame.draw.circle(self.screen, color, (x, y), radius)
-                label = self.font.render(unit["type"][0], True, (255, 255, 255))
-                self.screen.blit(label, (x - label.get_width() // 2, y - label.get_height() // 2))
+                color = UNIT_STATS[unit["type"]].color
+                self._dirty.append(pygame.draw.circle(self.screen, color, (x, y), radius))
+                label = self._render_cached(self.font, unit["type"][0], (255, 255, 255))
+                self._dirty.append(self.screen.blit(label, (x - label.get_width() // 2, y - label.get_height() // 2)))
 
     def draw_bullets(self) -> None:
-        for bullet in self.bullets:
-            if not bullet.get("visible", True):
-                continue
-            if self.phase == "combat" and self.current_match_id is not None:
-                if bullet.get("match_id") != self.current_match_id:
-                    continue
-            x, y = self.render_bullet_pos(bullet)
-            shadow_w, shadow_h = 14, 6
-            shadow = pygame.Surface((shadow_w, shadow_h), pygame.SRCALPHA)
-            pygame.draw.ellipse(shadow, (0, 0, 0, 60), shadow.get_rect())
-            self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 6))
-            pygame.draw.circle(self.screen, (240, 240, 60), (x, y), 5)
+        screen_x, screen_y = self._bullet_screen
+        if not len(screen_x):
+            return
+        shadow_w, shadow_h = 14, 6
+        shadow = pygame.Surface((shadow_w, shadow_h), pygame.SRCALPHA)
+        pygame.draw.ellipse(shadow, (0, 0, 0, 60), shadow.get_rect())
+        for x, y in zip(screen_x.tolist(), screen_y.tolist()):
+            self._dirty.append(self.screen.blit(shadow, (x - shadow_w // 2, y - shadow_h // 2 + 6)))
+            self._dirty.append(pygame.draw.circle(self.screen, (240, 240, 60), (x, y), 5))
 
     def draw_ui(self) -> None:
         ready = self.players.get(self.player_id, {}).get("ready", False) if self.player_id is not None else False
         if self.scene == "game":
-            pygame.draw.rect(self.screen, (50, 150, 70) if not ready else (150, 60, 60), self.ready_button)
+            self._dirty.append(pygame.draw.rect(self.screen, (50, 150, 70) if not ready else (150, 60, 60), self.ready_button))
             label = "Ready" if not ready else "Unready"
             self.draw_text(label, self.ready_button.centerx, self.ready_button.centery, center=True)
             self.draw_shop()
-            gold_text = self.big_font.render(f"Gold: {self.gold}", True, (245, 215, 120))
-            self.screen.blit(gold_text, (self.ready_button.x, self.ready_button.bottom + 10))
+            gold_text = self._render_cached(self.big_font, f"Gold: {self.gold}", (245, 215, 120))
+            self._dirty.append(self.screen.blit(gold_text, (self.ready_button.x, self.ready_button.bottom + 10)))
             my_hp = self.players.get(self.player_id, {}).get("health", 0) if self.player_id is not None else 0
-            hp_text = self.big_font.render(f"HP: {my_hp}", True, (200, 90, 90))
-            self.screen.blit(hp_text, (self.ready_button.x, self.ready_button.bottom + 44))
+            hp_text = self._render_cached(self.big_font, f"HP: {my_hp}", (200, 90, 90))
+            self._dirty.append(self.screen.blit(hp_text, (self.ready_button.x, self.ready_button.bottom + 44)))
 
-        phase_text = self.big_font.render(f"Phase: {self.phase}", True, (220, 220, 220))
-        self.screen.blit(phase_text, (40, 30))
+        phase_text = self._render_cached(self.big_font, f"Phase: {self.phase}", (220, 220, 220))
+        self._dirty.append(self.screen.blit(phase_text, (40, 30)))
         self.draw_timer()
 
         if self.last_error:
-            err = self.font.render(self.last_error, True, (240, 120, 120))
-            self.screen.blit(err, (40, 70))
+            err = self._render_cached(self.font, self.last_error, (240, 120, 120))
+            self._dirty.append(self.screen.blit(err, (40, 70)))
 
         y = 110
         self.draw_text("Players", 40, y)
@@ -605,9 +794,9 @@ class AutoBattlerClient:
             status = "Ready" if p.get("ready") else "Waiting"
             life = "Alive" if alive else "Out"
             text = f"#{pid + 1} {p.get('name', 'Player')} | HP:{hp} | {status} | {life}"
-            color = (160, 240, 160) if p.get("ready") else (200, 200, 200)
-            label = self.font.render(text, True, color)
-            self.screen.blit(label, (40, y))
+            color = READY_ROW_COLOR if p.get("ready") else WAITING_ROW_COLOR
+            label = self._render_cached(self.font, text, color)
+            self._dirty.append(self.screen.blit(label, (40, y)))
             y += 22
 
         bench_tiles = [t for t in self.tiles if t.is_bench]
@@ -620,42 +809,47 @@ class AutoBattlerClient:
 
         if self.dragging_unit:
             x, y = self.drag_pos
-            pygame.draw.circle(self.screen, (255, 255, 255), (x, y), 22, 2)
+            self._dirty.append(pygame.draw.circle(self.screen, (255, 255, 255), (x, y), 22, 2))
 
     def draw_timer(self) -> None:
         phase = self.timer.get("phase", "placement")
         remaining = max(0, int(self.timer.get("remaining", 0)))
         player_count = len(self.players)
         label = f"Round {self.round_number} | Players: {player_count} | {phase.capitalize()} - {remaining}s"
-        timer_surf = self.big_font.render(label, True, (230, 230, 240))
+        timer_surf = self._render_cached(self.big_font, label, (230, 230, 240))
         timer_bg = timer_surf.get_rect(center=(SCREEN_WIDTH // 2, 30))
-        pygame.draw.rect(self.screen, (40, 44, 64), timer_bg.inflate(20, 10), border_radius=10)
+        self._dirty.append(pygame.draw.rect(self.screen, (40, 44, 64), timer_bg.inflate(20, 10), border_radius=10))
         pygame.draw.rect(self.screen, (90, 120, 200), timer_bg.inflate(20, 10), width=2, border_radius=10)
-        self.screen.blit(timer_surf, timer_bg)
+        self._dirty.append(self.screen.blit(timer_surf, timer_bg))
+
+    def render_lobby_background(self) -> pygame.Surface:
+        """Vertical gradient for the lobby, filled column-wise through a pixel array view."""
+        gradient_top = np.array((30, 32, 50), dtype=np.float64)
+        gradient_bottom = np.array((14, 16, 28), dtype=np.float64)
+        t = (np.arange(SCREEN_HEIGHT) / SCREEN_HEIGHT)[:, None]
+        colors = (gradient_top * (1 - t) + gradient_bottom * t).astype(np.uint8)
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pixels = pygame.surfarray.pixels3d(background)
+        pixels[:, :, :] = colors[None, :, :]
+        del pixels  # release the surface lock
+        return background
 
     def draw_lobby(self) -> None:
         # Simple modern lobby overlay
-        gradient_top = (30, 32, 50)
-        gradient_bottom = (14, 16, 28)
-        for y in range(SCREEN_HEIGHT):
-            t = y / SCREEN_HEIGHT
-            r = int(gradient_top[0] * (1 - t) + gradient_bottom[0] * t)
-            g = int(gradient_top[1] * (1 - t) + gradient_bottom[1] * t)
-            b = int(gradient_top[2] * (1 - t) + gradient_bottom[2] * t)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+        self.screen.blit(self._lobby_bg, (0, 0))
 
         card = pygame.Rect(SCREEN_WIDTH // 2 - 220, SCREEN_HEIGHT // 2 - 140, 440, 260)
         pygame.draw.rect(self.screen, (40, 44, 64), card, border_radius=16)
         pygame.draw.rect(self.screen, (90, 120, 200), card, width=2, border_radius=16)
 
-        title = pygame.font.SysFont("arial", 38).render("Auto Battler Lobby", True, (240, 240, 255))
+        title = self._lobby_title
         self.screen.blit(title, (card.centerx - title.get_width() // 2, card.y + 30))
 
-        subtitle = self.small_font.render("Match with others, then jump into placement.", True, (200, 205, 220))
+        subtitle = self._render_cached(self.small_font, "Match with others, then jump into placement.", (200, 205, 220))
         self.screen.blit(subtitle, (card.centerx - subtitle.get_width() // 2, card.y + 80))
 
         # Player count
-        player_text = self.font.render(f"Players connected: {len(self.players)}", True, (210, 215, 230))
+        player_text = self._render_cached(self.font, f"Players connected: {len(self.players)}", (210, 215, 230))
         self.screen.blit(player_text, (card.centerx - player_text.get_width() // 2, card.y + 120))
 
         btn_color = (90, 160, 255)
@@ -666,7 +860,7 @@ class AutoBattlerClient:
         pygame.draw.rect(self.screen, (20, 32, 60), self.match_button, width=2, border_radius=12)
         self.draw_text("Find Match", self.match_button.centerx, self.match_button.centery, center=True, size=24)
 
-        helper = self.small_font.render("Click to enter placement and ready up.", True, (190, 195, 210))
+        helper = self._render_cached(self.small_font, "Click to enter placement and ready up.", (190, 195, 210))
         self.screen.blit(helper, (card.centerx - helper.get_width() // 2, self.match_button.bottom + 12))
 
         # Name input
@@ -677,104 +871,103 @@ class AutoBattlerClient:
             border_radius=8,
         )
         pygame.draw.rect(self.screen, (20, 32, 60), self.name_input_rect, width=2, border_radius=8)
-        name_text = self.font.render(self.name_input or "Enter name", True, (240, 240, 240))
+        name_text = self._render_cached(self.font, self.name_input or "Enter name", (240, 240, 240))
         self.screen.blit(name_text, (self.name_input_rect.x + 8, self.name_input_rect.y + 10))
 
         pygame.draw.rect(self.screen, (120, 185, 255), self.name_save_button, border_radius=8)
         pygame.draw.rect(self.screen, (20, 32, 60), self.name_save_button, width=2, border_radius=8)
         self.draw_text("Save Name", self.name_save_button.centerx, self.name_save_button.centery, center=True, size=18)
 
+    def _world_xy(self, x: float, y: float) -> Tuple[float, float]:
+        return x, y
+
+    def _mirror_xy(self, x: float, y: float) -> Tuple[float, float]:
+        # The top player of a pair sees the board rotated 180 degrees about its center.
+        return self.board_mid_x - (x - self.board_mid_x), self.board_mid_y - (y - self.board_mid_y)
+
     def render_pos(self, unit: Dict) -> Tuple[int, int]:
-        x, y = float(unit.get("x", 0)), float(unit.get("y", 0))
-        tile_id = unit.get("tile_id")
-        if self.player_id is None:
-            return self.project_point(x, y)
-        # Only flip if we are the top player in the pair
-        if self.is_flipped:
-            rx = self.board_mid_x - (x - self.board_mid_x)
-            ry = self.board_mid_y - (y - self.board_mid_y)
-            return self.project_point(rx, ry)
-        return self.project_point(x, y)
-
-    def render_bullet_pos(self, bullet: Dict) -> Tuple[int, int]:
-        x, y = float(bullet.get("x", 0)), float(bullet.get("y", 0))
-        if self.player_id is None:
-            return self.project_point(x, y)
-        if self.is_flipped:
-            rx = self.board_mid_x - (x - self.board_mid_x)
-            ry = self.board_mid_y - (y - self.board_mid_y)
-            return self.project_point(rx, ry)
-        return self.project_point(x, y)
+        return self.project_point(*self._render_xy(float(unit.get("x", 0)), float(unit.get("y", 0))))
 
     def draw_shop(self) -> None:
         mouse_pos = pygame.mouse.get_pos()
         for slot in self.shop_slots:
             rect: pygame.Rect = slot["rect"]
-            unit_name: str = slot["type"]
-            cost = UNIT_STATS[unit_name]["cost"]
-            hovered = rect.collidepoint(mouse_pos)
-
-            base_color = (68, 52, 90) if hovered else (54, 44, 70)
-            border_color = (160, 100, 200)
-            pygame.draw.rect(self.screen, base_color, rect, border_radius=8)
-            pygame.draw.rect(self.screen, border_color, rect, width=2, border_radius=8)
-
-            icon_area = pygame.Rect(rect.x + 10, rect.y + 8, rect.width - 20, rect.height - 52)
-            icon = self.assets.get_icon_scaled(unit_name, (icon_area.width, icon_area.height))
-            if icon:
-                icon_rect = icon.get_rect(center=icon_area.center)
-                self.screen.blit(icon, icon_rect)
-            else:
-                color = UNIT_STATS[unit_name]["color"]
-                pygame.draw.rect(self.screen, color, icon_area, border_radius=8)
-
-            # Name and cost bar
-            name_surf = self.font.render(unit_name, True, (240, 240, 240))
-            name_rect = name_surf.get_rect()
-            name_rect.midleft = (rect.x + 10, rect.bottom - 18)
-            self.screen.blit(name_surf, name_rect)
-
-            cost_text = self.font.render(str(cost), True, (240, 210, 120))
-            coin_x = rect.right - 26
-            coin_y = rect.bottom - 20
-            pygame.draw.circle(self.screen, (200, 170, 70), (coin_x, coin_y), 8)
-            self.screen.blit(cost_text, (coin_x + 12, coin_y - cost_text.get_height() // 2))
+            # Cards only change on hover, so both variants are pre-rendered in build_shop.
+            self._dirty.append(self.screen.blit(slot["surf_hover" if rect.collidepoint(mouse_pos) else "surf_idle"], rect))
+
+    def _get_font(self, size: int) -> pygame.font.Font:
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.SysFont("arial", size)
+        return font
+
+    def _render_cached(self, font: pygame.font.Font, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        key = (text, color, id(font))
+        surf = self._text_cache.get(key)
+        if surf is None:
+            surf = self._text_cache[key] = font.render(text, True, color)
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(key)
+        return surf
 
     def draw_text(self, text: str, x: int, y: int, center: bool = False, size: int = 20) -> None:
-        font = self.font if size == 20 else pygame.font.SysFont("arial", size)
-        surf = font.render(text, True, (230, 230, 230))
+        font = self._get_font(size)
+        surf = self._render_cached(font, text, (230, 230, 230))
         if center:
             rect = surf.get_rect(center=(x, y))
-            self.screen.blit(surf, rect)
+            self._dirty.append(self.screen.blit(surf, rect))
         else:
-            self.screen.blit(surf, (x, y))
+            self._dirty.append(self.screen.blit(surf, (x, y)))
 
     # --- Input handling ---
-    def pick_unit_at(self, pos: Tuple[int, int]) -> Optional[str]:
-        if self.player_id is None:
-            return None
-        px, py = pos
-        # Board units
-        for unit in self.units:
+    def build_pick_index(
+        self,
+    ) -> Tuple[Dict[Tuple[int, int], List[Tuple[int, int, int, int]]], List[Tuple[int, int, int]]]:
+        """Bucket own board units by screen cell and resolve bench units to their slot centers."""
+        grid: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]] = {}
+        for order, unit in enumerate(self.units):
             if unit.get("owner") != self.player_id or unit.get("status") != "board":
                 continue
             ux, uy = self.render_pos(unit)
-            dist = math.hypot(ux - px, uy - py)
-            if dist < 24:
-                self.drag_from_bench = False
-                return unit["id"]
+            grid.setdefault((ux // PICK_CELL_SIZE, uy // PICK_CELL_SIZE), []).append((order, ux, uy, unit["id"]))
 
-        # Bench units
-        bench_units = sorted(
-            [u for u in self.units if u.get("owner") == self.player_id and u.get("status") == "bench"],
-            key=lambda u: u["id"],
-        )
+        bench_units = self._bench_units_sorted
         slots = self.bench_slots(max(len(bench_units), 1))
+        bench = []
         for idx, unit in enumerate(bench_units):
             x, y = self.project_point(*slots[idx])
-            if math.hypot(x - px, y - py) < 20:
+            bench.append((x, y, unit["id"]))
+        return grid, bench
+
+    def pick_unit_at(self, pos: Tuple[int, int]) -> Optional[int]:
+        if self.player_id is None:
+            return None
+        if self._pick_index is None:
+            self._pick_index = self.build_pick_index()
+        grid, bench = self._pick_index
+        px, py = pos
+        # Board units: the pickup radius is smaller than a cell, so the 3x3 block around the cursor is enough.
+        # Overlapping hits resolve to the earliest unit in the state list, as a linear scan would.
+        best: Optional[Tuple[int, int]] = None
+        cell_x, cell_y = px // PICK_CELL_SIZE, py // PICK_CELL_SIZE
+        for gx in (cell_x - 1, cell_x, cell_x + 1):
+            for gy in (cell_y - 1, cell_y, cell_y + 1):
+                for order, ux, uy, unit_id in grid.get((gx, gy), ()):
+                    dx, dy = ux - px, uy - py
+                    if dx * dx + dy * dy < 24 * 24 and (best is None or order < best[0]):
+                        best = (order, unit_id)
+        if best is not None:
+            self.drag_from_bench = False
+            return best[1]
+
+        # Bench units
+        for x, y, unit_id in bench:
+            dx, dy = x - px, y - py
+            if dx * dx + dy * dy < 20 * 20:
                 self.drag_from_bench = True
-                return unit["id"]
+                return unit_id
         return None
 
     def handle_mouse_down(self, pos: Tuple[int, int]) -> None:
@@ -822,6 +1015,102 @@ class AutoBattlerClient:
             self.network.send({"type": "bench_unit", "unit_id": self.dragging_unit})
         self.dragging_unit = None
 
+    def render_frame(self) -> None:
+        # Without a moving video background the game scene is static apart from what was drawn
+        # on top of it, so only last frame's and this frame's rects need repainting and presenting.
+        partial = (
+            self.scene == "game"
+            and self._drawn_scene == "game"
+            and not (self.video_cap and self.video_cap.isOpened())
+        )
+        if partial:
+            for rect in self._prev_dirty:
+                self.screen.blit(self._game_background, rect, rect)
+        else:
+            self.screen.fill(BG_COLOR)
+        
+        # Update and draw video background
+        if self.video_cap and self.video_cap.isOpened():
+            ret, frame = self.video_cap.read()
+            if not ret:
+                # Loop video
+                self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.video_cap.read()
+            
+            if ret:
+                # Convert BGR to RGB
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                
+                if self.project_video_on_ground:
+                    # Define World Plane for Video (Large rectangle on Z=0)
+                    # Center matches board center
+                    wcx = self.board_mid_x
+                    wcy = -self.board_mid_y
+                    # Size of the "rug"
+                    # Reduced from 4000 to 3000 to "zoom out" the background texture
+                    w_size = 4000
+                    h_size = 4000
+                    
+                    # World Corners: TL, TR, BR, BL
+                    # Note: Y is North (+), X is Right (+)
+                    world_corners = [
+                        (wcx - w_size/2, wcy + h_size/2), # TL (North-West)
+                        (wcx + w_size/2, wcy + h_size/2), # TR (North-East)
+                        (wcx + w_size/2, wcy - h_size/2), # BR (South-East)
+                        (wcx - w_size/2, wcy - h_size/2), # BL (South-West)
+                    ]
+                    
+                    # Project to Screen Coordinates
+                    # project_point takes (x, y) where y is mapped to -WorldY
+                    # So we pass (wx, -wy)
+                    screen_corners = []
+                    for wx, wy in world_corners:
+                        sx, sy = self.project_point(wx, -wy)
+                        screen_corners.append([sx, sy])
+                    
+                    dst_points = np.array(screen_corners, dtype=np.float32)
+                    
+                    # Source points (Video frame corners)
+                    h, w = frame.shape[:2]
+                    src_points = np.array([
+                        [0, 0],
+                        [w, 0],
+                        [w, h],
+                        [0, h]
+                    ], dtype=np.float32)
+                    
+                    # Compute Homography
+                    matrix = cv2.getPerspectiveTransform(src_points, dst_points)
+                    
+                    # Warp
+                    # We warp to the full screen size
+                    # Use LANCZOS4 for better quality (sharper results)
+                    warped = cv2.warpPerspective(frame, matrix, (SCREEN_WIDTH, SCREEN_HEIGHT), flags=cv2.INTER_LANCZOS4)
+                    
+                    self.video_frame = pygame.image.frombuffer(warped.tobytes(), warped.shape[1::-1], "RGB")
+                    self.screen.blit(self.video_frame, (0, 0))
+                else:
+                    # Normal 2D background rendering
+                    frame = cv2.resize(frame, (SCREEN_WIDTH, SCREEN_HEIGHT))
+                    self.video_frame = pygame.image.frombuffer(frame.tobytes(), frame.shape[1::-1], "RGB")
+                    self.screen.blit(self.video_frame, (0, 0))
+        
+        self._dirty = []
+        if self.scene == "lobby":
+            self.draw_lobby()
+        else:
+            if not partial:
+                self.draw_tiles()
+            self.draw_units()
+            self.draw_bullets()
+            self.draw_ui()
+        if partial:
+            pygame.display.update(self._prev_dirty + self._dirty)
+        else:
+            pygame.display.flip()
+        self._prev_dirty = self._dirty
+        self._drawn_scene = self.scene
+
     def run(self) -> None:
         running = True
         while running:
@@ -831,6 +1120,9 @@ class AutoBattlerClient:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    # The window contents were lost; repaint everything next frame.
+                    self._drawn_scene = None
                 elif self.scene == "lobby":
                     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                         if self.match_button.collidepoint(event.pos):
@@ -865,84 +1157,7 @@ class AutoBattlerClient:
                 elif event.type == pygame.MOUSEMOTION and self.dragging_unit:
                     self.drag_pos = event.pos
 
-            self.screen.fill(BG_COLOR)
-            
-            self.screen.fill(BG_COLOR)
-            
-            # Update and draw video background
-            if self.video_cap and self.video_cap.isOpened():
-                ret, frame = self.video_cap.read()
-                if not ret:
-                    # Loop video
-                    self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ret, frame = self.video_cap.read()
-                
-                if ret:
-                    # Convert BGR to RGB
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    if self.project_video_on_ground:
-                        # Define World Plane for Video (Large rectangle on Z=0)
-                        # Center matches board center
-                        wcx = self.board_mid_x
-                        wcy = -self.board_mid_y
-                        # Size of the "rug"
-                        # Reduced from 4000 to 3000 to "zoom out" the background texture
-                        w_size = 4000
-                        h_size = 4000
-                        
-                        # World Corners: TL, TR, BR, BL
-                        # Note: Y is North (+), X is Right (+)
-                        world_corners = [
-                            (wcx - w_size/2, wcy + h_size/2), # TL (North-West)
-                            (wcx + w_size/2, wcy + h_size/2), # TR (North-East)
-                            (wcx + w_size/2, wcy - h_size/2), # BR (South-East)
-                            (wcx - w_size/2, wcy - h_size/2), # BL (South-West)
-                        ]
-                        
-                        # Project to Screen Coordinates
-                        # project_point takes (x, y) where y is mapped to -WorldY
-                        # So we pass (wx, -wy)
-                        screen_corners = []
-                        for wx, wy in world_corners:
-                            sx, sy = self.project_point(wx, -wy)
-                            screen_corners.append([sx, sy])
-                        
-                        dst_points = np.array(screen_corners, dtype=np.float32)
-                        
-                        # Source points (Video frame corners)
-                        h, w = frame.shape[:2]
-                        src_points = np.array([
-                            [0, 0],
-                            [w, 0],
-                            [w, h],
-                            [0, h]
-                        ], dtype=np.float32)
-                        
-                        # Compute Homography
-                        matrix = cv2.getPerspectiveTransform(src_points, dst_points)
-                        
-                        # Warp
-                        # We warp to the full screen size
-                        # Use LANCZOS4 for better quality (sharper results)
-                        warped = cv2.warpPerspective(frame, matrix, (SCREEN_WIDTH, SCREEN_HEIGHT), flags=cv2.INTER_LANCZOS4)
-                        
-                        self.video_frame = pygame.image.frombuffer(warped.tobytes(), warped.shape[1::-1], "RGB")
-                        self.screen.blit(self.video_frame, (0, 0))
-                    else:
-                        # Normal 2D background rendering
-                        frame = cv2.resize(frame, (SCREEN_WIDTH, SCREEN_HEIGHT))
-                        self.video_frame = pygame.image.frombuffer(frame.tobytes(), frame.shape[1::-1], "RGB")
-                        self.screen.blit(self.video_frame, (0, 0))
-            
-            if self.scene == "lobby":
-                self.draw_lobby()
-            else:
-                self.draw_tiles()
-                self.draw_units()
-                self.draw_bullets()
-                self.draw_ui()
-            pygame.display.flip()
+            self.render_frame()
             self.clock.tick(60)
 
         pygame.quit()
@@ -952,9 +1167,12 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Auto battler pygame client")
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument(
+        "--video-background", action="store_true", help="play assets/background.mp4 behind the board"
+    )
     args = parser.parse_args()
 
-    client = AutoBattlerClient(args.host, args.port)
+    client = AutoBattlerClient(args.host, args.port, video_background=args.video_background)
     client.run()
 
 
@@ -1,25 +1,44 @@
 import asyncio
-import json
+import struct
 from typing import Any, Dict, Optional
 
+import msgpack
+
+# Wire format: each message is a msgpack map preceded by its byte length as a 4-byte big-endian integer.
+HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 1 << 20
+
+
+def encode_message(payload: Dict[str, Any]) -> bytes:
+    body = msgpack.packb(payload, use_bin_type=True)
+    return HEADER.pack(len(body)) + body
+
+
+def decode_message(body: bytes) -> Dict[str, Any]:
+    return msgpack.unpackb(body, raw=False)
+
 
 async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
     try:
-        line = await reader.readline()
+        header = await reader.readexactly(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        if length > MAX_MESSAGE_BYTES:
+            return None
+        body = await reader.readexactly(length)
     except (asyncio.IncompleteReadError, ConnectionResetError):
         return None
-    if not line:
-        return None
     try:
-        return json.loads(line.decode("utf-8"))
-    except json.JSONDecodeError:
+        return decode_message(body)
+    except (ValueError, msgpack.UnpackException):
         return None
 
 
-async def send_message(writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+async def send_message(writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> bool:
+    """Write one message; returns False once the connection is gone."""
     try:
-        data = (json.dumps(payload) + "\n").encode("utf-8")
+        data = encode_message(payload)
         writer.write(data)
         await writer.drain()
     except (ConnectionResetError, ConnectionError, BrokenPipeError):
-        pass
+        return False
+    return True
@@ -1,8 +1,10 @@
 import asyncio
 import random
+import socket
 import time
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional
 
+from board import Side
 from config import (
     ACCEL_SECONDS,
     AI_OWNER_ID,
@@ -13,13 +15,27 @@ from config import (
     PLAYER_START_HEALTH,
     PREP_SECONDS,
     TICKS_PER_SECOND,
-    UNIT_STATS,
+    UNIT_COST,
 )
-from network import read_message, send_message
+from network import MAX_MESSAGE_BYTES, encode_message, read_message, send_message
 from simulation import BattleSimulation
 
 
+# Combat ticks send deltas; a full snapshot still goes out at least this often to bound drift.
+FULL_STATE_INTERVAL_TICKS = TICKS_PER_SECOND
+# Placement changes are pushed as they happen; the periodic broadcast is then only a keepalive.
+IDLE_BROADCAST_SECONDS = 5.0
+
+# Kernel send buffer per client, sized so a burst of tick broadcasts does not stall drain().
+SEND_BUFFER_BYTES = 256 * 1024
+
+# MAX_PLAYERS is small, so a bound list shuffle beats converting to a NumPy permutation.
+_shuffle = random.shuffle
+
+
 class PlayerSession:
+    __slots__ = ("player_id", "writer", "ready", "name", "health", "alive", "gold", "in_game", "closed")
+
     def __init__(self, player_id: int, writer: asyncio.StreamWriter) -> None:
         self.player_id = player_id
         self.writer = writer
@@ -29,6 +45,8 @@ class PlayerSession:
         self.alive = True
         self.gold = 10
         self.in_game = False
+        # Set on the first failed write; broadcasts skip the session until its disconnect runs.
+        self.closed = False
 
 
 class AutoBattlerServer:
@@ -38,12 +56,28 @@ class AutoBattlerServer:
         self.sim = BattleSimulation()
         self.sessions: Dict[int, PlayerSession] = {}
         self.server: Optional[asyncio.base_events.Server] = None
+        # Bound in start(); its clock is the monotonic one, read without going through the time module.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.combat_start_time: Optional[float] = None
         self.accel_started = False
         self.phase_start_time: Optional[float] = None  # unused when prep timer disabled
-        self.last_timer_broadcast: float = time.monotonic()
-        self.last_state_broadcast: float = time.monotonic()
+        # Seeded from clock() in start(), once the loop whose clock every later read uses is bound.
+        self.last_timer_broadcast: float = 0.0
+        self.last_state_broadcast: float = 0.0
         self.round_number: int = 1
+        # What every client was last sent; all sessions receive the same broadcasts, so one baseline suffices.
+        self.sent_units: Dict[int, Dict] = {}
+        self.sent_players: Optional[list] = None
+        self.sent_phase: Optional[str] = None
+        self.full_state_tick = 0
+        # Placement actions only mark the state dirty; game_loop coalesces them into one broadcast.
+        self.state_dirty = False
+        self.state_changed = asyncio.Event()
+        # Circle-method order for make_pairs; the first slot stays put and the rest rotate each round.
+        # An odd player count carries one None slot, the bye, so the player sitting out rotates too.
+        self._pair_rotation: List[Optional[int]] = []
+        # Rotations made so far; odd ones swap each pair's sides, since the fixed first slot always pairs first.
+        self._pair_turn = 0
 
     # --- Connection management ---
     def next_player_id(self) -> Optional[int]:
@@ -60,12 +94,16 @@ class AutoBattlerServer:
             await writer.wait_closed()
             return
 
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            # Small per-tick frames must not wait on Nagle's algorithm.
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
         session = PlayerSession(player_id, writer)
         self.sessions[player_id] = session
         await send_message(writer, {"type": "welcome", "player_id": player_id})
         await self.send_full_state(writer)
-        await self.broadcast_lobby()
-        await self.broadcast_state()
+        await self.broadcast_lobby_and_state()
 
         try:
             while True:
@@ -84,8 +122,7 @@ class AutoBattlerServer:
             await session.writer.wait_closed()
         except Exception:
             pass
-        await self.broadcast_lobby()
-        await self.broadcast_state()
+        await self.broadcast_lobby_and_state()
 
     # --- Player actions ---
     async def handle_message(self, session: PlayerSession, msg: Dict) -> None:
@@ -95,16 +132,16 @@ class AutoBattlerServer:
             await self.maybe_start_combat()
         elif msg.get("type") == "spawn":
             unit_type = msg.get("unit_type")
-            if unit_type not in UNIT_STATS:
+            cost = UNIT_COST.get(unit_type)
+            if cost is None:
                 await self.send_error(session, "Unknown unit type")
                 return
-            cost = UNIT_STATS[unit_type]["cost"]
             if session.gold < cost:
                 await self.send_error(session, "Not enough gold")
                 return
             session.gold -= cost
             self.sim.spawn_unit(session.player_id, unit_type)
-            await self.broadcast_state()
+            self.mark_dirty()
         elif msg.get("type") == "place_unit":
             unit_id = msg.get("unit_id")
             tile = msg.get("tile")
@@ -119,7 +156,7 @@ class AutoBattlerServer:
             )
             if not ok:
                 await self.send_error(session, "Could not place unit")
-            await self.broadcast_state()
+            self.mark_dirty()
         elif msg.get("type") == "bench_unit":
             unit_id = msg.get("unit_id")
             if not self.validate_owner(unit_id, session.player_id):
@@ -129,7 +166,7 @@ class AutoBattlerServer:
                 await self.send_error(session, "Cannot bench units during combat")
                 return
             self.sim.move_unit_to_bench(unit_id)
-            await self.broadcast_state()
+            self.mark_dirty()
         elif msg.get("type") == "sell_unit":
             unit_id = msg.get("unit_id")
             if self.sim.phase != "placement":
@@ -142,45 +179,41 @@ class AutoBattlerServer:
             if not unit:
                 await self.send_error(session, "Unit not found")
                 return
-            cost = UNIT_STATS.get(unit.unit_type, {}).get("cost", 1)
-            refund = max(1, int(cost * 0.5))
+            refund = max(1, int(UNIT_COST.get(unit.unit_type, 1) * 0.5))
             self.sim.remove_unit(unit_id)
             session.gold += refund
-            await self.broadcast_state()
+            self.mark_dirty()
         elif msg.get("type") == "enter_game":
             session.in_game = True
             if self.all_alive_in_game():
-                now = time.monotonic()
+                now = self.clock()
                 self.phase_start_time = now
                 self.last_timer_broadcast = now
-            await self.broadcast_lobby()
-            await self.broadcast_state()
+            await self.broadcast_lobby_and_state()
         elif msg.get("type") == "set_name":
             new_name = msg.get("name")
             if isinstance(new_name, str) and new_name.strip():
                 session.name = new_name.strip()[:24]
-                await self.broadcast_lobby()
-                await self.broadcast_state()
+                await self.broadcast_lobby_and_state()
         elif msg.get("type") == "force_start":
             await self.force_start()
         else:
             await self.send_error(session, "Unknown command")
 
-    def validate_owner(self, unit_id: Optional[str], player_id: int) -> bool:
+    def validate_owner(self, unit_id: Optional[int], player_id: int) -> bool:
         if not unit_id:
             return False
         unit = self.sim.units.get(unit_id)
         return unit is not None and unit.owner_id == player_id
 
     async def send_error(self, session: PlayerSession, message: str) -> None:
-        await send_message(session.writer, {"type": "error", "message": message})
+        if not await send_message(session.writer, {"type": "error", "message": message}):
+            self.drop_session(session)
 
     def remove_units_for_player(self, player_id: int) -> None:
-        for unit_id, unit in list(self.sim.units.items()):
-            if unit.owner_id == player_id:
-                if unit.tile_id:
-                    self.sim.tile_occupants.pop(f"{unit.tile_id}:{unit.owner_id}", None)
-                self.sim.units.pop(unit_id, None)
+        # Copy the ids first; remove_unit shrinks the owner's index while we walk it.
+        for unit_id in list(self.sim.units_by_owner.get(player_id, ())):
+            self.sim.remove_unit(unit_id)
         session = self.sessions.get(player_id)
         if session:
             session.in_game = False
@@ -212,7 +245,7 @@ class AutoBattlerServer:
             return
         self.sim.prepare_pairs(pairs)
         self.sim.start_combat()
-        self.combat_start_time = time.monotonic()
+        self.combat_start_time = self.clock()
         self.accel_started = False
         self.phase_start_time = self.combat_start_time
         self.last_timer_broadcast = self.phase_start_time
@@ -220,43 +253,106 @@ class AutoBattlerServer:
 
     # --- Broadcast helpers ---
     async def broadcast(self, payload: Dict) -> None:
-        for session in list(self.sessions.values()):
-            await send_message(session.writer, payload)
-
-    async def broadcast_state(self) -> None:
-        payload = {
-            "type": "state",
-            **self.sim.as_payload(),
-            "players": self.players_payload(),
-            "timers": self.timer_payload(),
-            "round": self.round_number,
-        }
+        # Every session gets the same bytes, so encode once rather than per recipient.
+        await self.broadcast_raw(encode_message(payload))
+
+    async def broadcast_raw(self, data: bytes) -> None:
+        sessions = [s for s in self.sessions.values() if not s.closed]
+        for session in sessions:
+            session.writer.write(data)
+        # Drain concurrently so one slow client does not hold up delivery to the others.
+        results = await asyncio.gather(*(s.writer.drain() for s in sessions), return_exceptions=True)
+        for session, result in zip(sessions, results):
+            if isinstance(result, Exception):
+                self.drop_session(session)
+
+    def drop_session(self, session: PlayerSession) -> None:
+        # Closing the transport ends the session's read loop, which runs the normal disconnect.
+        session.closed = True
+        session.writer.close()
+
+    def mark_dirty(self) -> None:
+        self.state_dirty = True
+        self.state_changed.set()
+
+    async def broadcast_state(
+        self, delta: bool = False, players: Optional[list] = None, timers: Optional[dict] = None
+    ) -> None:
+        # Any state broadcast carries the pending changes, whichever path sends it.
+        self.state_dirty = False
+        frame = self.build_state_frame(players=players, timers=timers)
+        units = {u["id"]: u for u in frame["units"]}
+        if (
+            delta
+            and self.sim.phase == self.sent_phase
+            and self.sim.tick - self.full_state_tick < FULL_STATE_INTERVAL_TICKS
+        ):
+            changes = []
+            for unit_id, unit in units.items():
+                prev = self.sent_units.get(unit_id)
+                if prev is unit:
+                    # Cached payloads are only rebuilt on change, so the same dict means nothing moved.
+                    continue
+                if prev is None:
+                    changes.append(unit)
+                    continue
+                diff = {key: value for key, value in unit.items() if prev.get(key) != value}
+                if diff:
+                    diff["id"] = unit_id
+                    changes.append(diff)
+            payload = {
+                "type": "state_delta",
+                "phase": frame["phase"],
+                "tick": frame["tick"],
+                "bullets": frame["bullets"],
+                "changes": changes,
+                "removed": [unit_id for unit_id in self.sent_units if unit_id not in units],
+                "timers": frame["timers"],
+                "round": self.round_number,
+            }
+            if frame["players"] != self.sent_players:
+                payload["players"] = frame["players"]
+        else:
+            payload = frame
+            self.full_state_tick = self.sim.tick
+        self.sent_units = units
+        self.sent_players = frame["players"]
+        self.sent_phase = self.sim.phase
         await self.broadcast(payload)
 
-    async def broadcast_lobby(self) -> None:
+    async def broadcast_lobby(self, players: Optional[list] = None, timers: Optional[dict] = None) -> None:
         await self.broadcast(
             {
                 "type": "lobby",
-                "players": self.players_payload(),
+                "players": self.players_payload() if players is None else players,
                 "phase": self.sim.phase,
-                "timers": self.timer_payload(),
+                "timers": self.timer_payload() if timers is None else timers,
                 "round": self.round_number,
             }
         )
 
-    async def send_full_state(self, writer: asyncio.StreamWriter) -> None:
-        await send_message(
-            writer,
-            {
-                "type": "state",
-                **self.sim.as_payload(),
-                "players": self.players_payload(),
-                "timers": self.timer_payload(),
-                "round": self.round_number,
-            },
-        )
+    async def broadcast_lobby_and_state(self) -> None:
+        players = self.players_payload()
+        timers = self.timer_payload()
+        await self.broadcast_lobby(players, timers)
+        await self.broadcast_state(players=players, timers=timers)
 
-    def players_payload(self) -> list:
+    async def send_full_state(self, writer: asyncio.StreamWriter) -> None:
+        await send_message(writer, self.build_state_frame())
+
+    def build_state_frame(
+        self, now: Optional[float] = None, players: Optional[list] = None, timers: Optional[dict] = None
+    ) -> Dict:
+        """A full "state" message, filled in place rather than merged from per-part dicts."""
+        frame: Dict = {"type": "state", "round": self.round_number}
+        self.sim.fill_payload(frame)
+        frame["players"] = self.players_payload() if players is None else players
+        frame["timers"] = self.timer_payload(now) if timers is None else timers
+        return frame
+
+    def players_payload(self, sessions: Optional[Iterable[PlayerSession]] = None) -> list:
+        if sessions is None:
+            sessions = self.sessions.values()
         return [
             {
                 "id": s.player_id,
@@ -267,11 +363,12 @@ class AutoBattlerServer:
                 "gold": s.gold,
                 "in_game": s.in_game,
             }
-            for s in self.sessions.values()
+            for s in sessions
         ]
 
-    def timer_payload(self) -> dict:
-        now = time.monotonic()
+    def timer_payload(self, now: Optional[float] = None, sessions: Optional[Iterable[PlayerSession]] = None) -> dict:
+        if now is None:
+            now = self.clock()
         if self.sim.phase == "combat":
             elapsed = now - (self.combat_start_time or now)
             accel = self.accel_started
@@ -282,63 +379,98 @@ class AutoBattlerServer:
                 "remaining": remaining_combat if not accel else remaining_accel,
             }
         else:
-            if self.phase_start_time is not None and self.should_run_prep_countdown():
+            if self.phase_start_time is not None and self.should_run_prep_countdown(sessions):
                 remaining = max(0, PREP_SECONDS - (now - self.phase_start_time))
             else:
                 remaining = PREP_SECONDS
             return {"phase": "placement", "remaining": remaining}
 
-    def should_run_prep_countdown(self) -> bool:
+    def should_run_prep_countdown(self, sessions: Optional[Iterable[PlayerSession]] = None) -> bool:
         if self.sim.phase != "placement":
             return False
-        alive_in_game = [s for s in self.sessions.values() if s.alive and s.in_game]
+        if sessions is None:
+            sessions = self.sessions.values()
+        alive_in_game = [s for s in sessions if s.alive and s.in_game]
         if not alive_in_game:
             return False
         if self.round_number >= 2:
             return True
         return len(alive_in_game) >= MAX_PLAYERS
 
-    def all_alive_in_game(self) -> bool:
-        alive_sessions = [s for s in self.sessions.values() if s.alive]
+    def all_alive_in_game(self, sessions: Optional[Iterable[PlayerSession]] = None) -> bool:
+        if sessions is None:
+            sessions = self.sessions.values()
+        alive_sessions = [s for s in sessions if s.alive]
         if not alive_sessions:
             return False
         return all(s.in_game for s in alive_sessions)
 
-    def alive_count(self) -> int:
-        return len([s for s in self.sessions.values() if s.alive])
+    def alive_count(self, sessions: Optional[Iterable[PlayerSession]] = None) -> int:
+        if sessions is None:
+            sessions = self.sessions.values()
+        return sum(1 for s in sessions if s.alive)
 
-    def all_ready_alive(self) -> bool:
-        alive_sessions = [s for s in self.sessions.values() if s.alive and s.in_game]
+    def all_ready_alive(self, sessions: Optional[Iterable[PlayerSession]] = None) -> bool:
+        if sessions is None:
+            sessions = self.sessions.values()
+        alive_sessions = [s for s in sessions if s.alive and s.in_game]
         if not alive_sessions:
             return False
         return all(s.ready for s in alive_sessions)
 
-    def alive_in_game_count(self) -> int:
-        return len([s for s in self.sessions.values() if s.alive and s.in_game])
+    def alive_in_game_count(self, sessions: Optional[Iterable[PlayerSession]] = None) -> int:
+        if sessions is None:
+            sessions = self.sessions.values()
+        return sum(1 for s in sessions if s.alive and s.in_game)
 
-    def side_for_player(self, session: PlayerSession) -> str:
+    def side_for_player(self, session: PlayerSession) -> Side:
         # All players place on friendly (bottom) during placement; server mirrors opponent on combat start.
-        return "friendly"
+        return Side.FRIENDLY
 
     def make_pairs(self, *, use_ready_only: bool = True) -> list:
         if use_ready_only:
             ids = [s.player_id for s in self.sessions.values() if s.ready and s.alive and s.in_game]
         else:
             ids = [s.player_id for s in self.sessions.values() if s.alive and s.in_game]
-        random.shuffle(ids)
-        pairs = []
-        for i in range(0, len(ids) - 1, 2):
-            pairs.append((ids[i], ids[i + 1]))
+        # Keep the rotation order for players still eligible; newcomers join at the end in random order.
+        eligible = set(ids)
+        rotation = [pid for pid in self._pair_rotation if pid is None or pid in eligible]
+        kept = set(rotation)
+        newcomers = [pid for pid in ids if pid not in kept]
+        _shuffle(newcomers)
+        rotation += newcomers
+        if len(ids) % 2 and None not in kept:
+            rotation.append(None)
+        elif not len(ids) % 2 and None in kept:
+            rotation.remove(None)
+        # Fold the circle: first meets last, second meets second-to-last; whoever meets the bye sits out.
+        pairs = [
+            (rotation[i], rotation[-1 - i])
+            for i in range(len(rotation) // 2)
+            if rotation[i] is not None and rotation[-1 - i] is not None
+        ]
+        # The first element of a pair plays the bottom side, so alternate it instead of pinning it by join order.
+        if self._pair_turn % 2:
+            pairs = [(b, a) for a, b in pairs]
+        self._pair_turn += 1
+        self._pair_rotation = rotation[:1] + rotation[2:] + rotation[1:2]
         return pairs
 
     # --- Main loop ---
     async def game_loop(self) -> None:
         while True:
             prev_phase = self.sim.phase
+            # One clock read per iteration serves the timers, the phase checks and the broadcasts.
+            now = self.clock()
+            if self.state_dirty and self.sim.phase != "combat":
+                await self.broadcast_state()
+            # Sessions as of this iteration, shared by the helpers below until the next await reshapes them.
+            live = tuple(self.sessions.values())
             if self.sim.phase == "combat":
                 self.sim.tick_combat()
-                await self.broadcast_state()
-                now = time.monotonic()
+                await self.broadcast_state(
+                    delta=True, players=self.players_payload(live), timers=self.timer_payload(now, live)
+                )
                 elapsed = now - (self.combat_start_time or now)
                 if elapsed >= COMBAT_SECONDS + ACCEL_SECONDS:
                     await self.resolve_combat(force_timeout=True)
@@ -352,8 +484,7 @@ class AutoBattlerServer:
                     await self.broadcast_state()
                 await asyncio.sleep(1 / TICKS_PER_SECOND)
             else:
-                now = time.monotonic()
-                countdown_active = self.should_run_prep_countdown()
+                countdown_active = self.should_run_prep_countdown(live)
                 if countdown_active and self.phase_start_time is None:
                     self.phase_start_time = now
                 if not countdown_active:
@@ -362,13 +493,27 @@ class AutoBattlerServer:
                     elapsed = now - self.phase_start_time
                     if elapsed >= PREP_SECONDS:
                         await self.maybe_start_combat(force_timer=True)
-                if self.last_timer_broadcast is None or now - self.last_timer_broadcast >= 1.0:
-                    self.last_timer_broadcast = now
-                    await self.broadcast_lobby()
-                if self.last_state_broadcast is None or now - self.last_state_broadcast >= 1.0:
-                    self.last_state_broadcast = now
-                    await self.broadcast_state()
-                await asyncio.sleep(0.15)
+                        live = tuple(self.sessions.values())
+                # A running countdown changes the timer every second; otherwise nothing moves without an event.
+                lobby_interval = 1.0 if countdown_active else IDLE_BROADCAST_SECONDS
+                lobby_due = self.last_timer_broadcast is None or now - self.last_timer_broadcast >= lobby_interval
+                state_due = self.last_state_broadcast is None or now - self.last_state_broadcast >= IDLE_BROADCAST_SECONDS
+                if lobby_due or state_due:
+                    # Both periodic broadcasts usually fire together; build the shared parts once.
+                    players = self.players_payload(live)
+                    timers = self.timer_payload(now, live)
+                    if lobby_due:
+                        self.last_timer_broadcast = now
+                        await self.broadcast_lobby(players, timers)
+                    if state_due:
+                        self.last_state_broadcast = now
+                        await self.broadcast_state(players=players, timers=timers)
+                # Sleep until the next timer check, waking early when a player action dirties the state.
+                try:
+                    await asyncio.wait_for(self.state_changed.wait(), 0.15)
+                except asyncio.TimeoutError:
+                    pass
+                self.state_changed.clear()
             if prev_phase == "combat" and self.sim.phase == "placement":
                 self.phase_start_time = None
                 for session in self.sessions.values():
@@ -418,11 +563,21 @@ class AutoBattlerServer:
         self.phase_start_time = None
         for session in self.sessions.values():
             session.ready = False
-        await self.broadcast_state()
-        await self.broadcast_lobby()
+        players = self.players_payload()
+        timers = self.timer_payload()
+        await self.broadcast_state(players=players, timers=timers)
+        await self.broadcast_lobby(players, timers)
+
+    def clock(self) -> float:
+        return self._loop.time() if self._loop is not None else time.monotonic()
 
     async def start(self) -> None:
-        self.server = await asyncio.start_server(self.handle_client, host=self.host, port=self.port)
+        self._loop = asyncio.get_running_loop()
+        self.last_timer_broadcast = self.last_state_broadcast = self.clock()
+        # Let a whole maximum-size frame sit in the reader buffer instead of pausing the transport partway.
+        self.server = await asyncio.start_server(
+            self.handle_client, host=self.host, port=self.port, limit=MAX_MESSAGE_BYTES
+        )
         print(f"Server listening on {self.host}:{self.port} (max {MAX_PLAYERS} players)")
         async with self.server:
             await asyncio.gather(self.server.serve_forever(), self.game_loop())
@@ -430,6 +585,11 @@ class AutoBattlerServer:
 
 if __name__ == "__main__":
     try:
-        asyncio.run(AutoBattlerServer().start())
+        # uvloop is optional; its C event loop cuts per-callback overhead on the broadcast path.
+        from uvloop import run as run_loop
+    except ImportError:
+        run_loop = asyncio.run
+    try:
+        run_loop(AutoBattlerServer().start())
     except KeyboardInterrupt:
         pass
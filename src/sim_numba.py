@@ -0,0 +1,245 @@
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain NumPy.
+    njit = None
+
+
+def advance_bullets(
+    bx: np.ndarray,
+    by: np.ndarray,
+    target_slot: np.ndarray,
+    damage: np.ndarray,
+    spawn_tick: np.ndarray,
+    bullet_match: np.ndarray,
+    visible: np.ndarray,
+    count: int,
+    xs: np.ndarray,
+    ys: np.ndarray,
+    hp: np.ndarray,
+    status: np.ndarray,
+    matches: np.ndarray,
+    hit: np.ndarray,
+    tick: int,
+    speed: float,
+    hit_dist_sq: float,
+    ttl: int,
+    dead_code: int,
+) -> int:
+    """One tick of bullet flight over bullets [0, count); returns how many are still in flight.
+
+    Survivors are compacted to the front in their original order and units that took a hit
+    are flagged. A hit can kill the target for the bullets after it, so this stays one
+    sequential loop on both the compiled and the plain path.
+    """
+    kept = 0
+    for b in range(count):
+        t = target_slot[b]
+        if hp[t] <= 0 or matches[t] != bullet_match[b] or tick - spawn_tick[b] > ttl:
+            continue
+        dx = xs[t] - bx[b]
+        dy = ys[t] - by[b]
+        dist_sq = dx * dx + dy * dy
+        if dist_sq <= hit_dist_sq:
+            hp[t] -= damage[b]
+            hit[t] = True
+            if hp[t] <= 0:
+                status[t] = dead_code
+            continue
+        dist = math.sqrt(dist_sq)
+        step = min(speed, dist)
+        # Only already-visited rows are overwritten, so every bullet is still read once.
+        bx[kept] = bx[b] + dx / dist * step
+        by[kept] = by[b] + dy / dist * step
+        target_slot[kept] = t
+        damage[kept] = damage[b]
+        spawn_tick[kept] = spawn_tick[b]
+        bullet_match[kept] = bullet_match[b]
+        visible[kept] = visible[b]
+        kept += 1
+    return kept
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True)
+    def nearest_enemies(
+        xs: np.ndarray,
+        ys: np.ndarray,
+        owners: np.ndarray,
+        alive: np.ndarray,
+        order: np.ndarray,
+        bounds: np.ndarray,
+        stale: np.ndarray,
+        targets: np.ndarray,
+    ) -> None:
+        """Write each stale-group unit's closest live unit of another owner into targets; -1 where there is none.
+
+        order lists the slots grouped by match (ascending slot within a group) and group g spans
+        order[bounds[g]:bounds[g + 1]], so each seeker only scans its own match. Matches share
+        nothing, so the groups run in parallel; each writes only its own seekers' targets.
+        """
+        for group in prange(bounds.shape[0] - 1):
+            if not stale[group]:
+                continue
+            start = bounds[group]
+            end = bounds[group + 1]
+            for a in range(start, end):
+                seeker = order[a]
+                if not alive[seeker]:
+                    targets[seeker] = -1
+                    continue
+                sx = xs[seeker]
+                sy = ys[seeker]
+                owner = owners[seeker]
+                best = -1
+                best_dist_sq = np.inf
+                for b in range(start, end):
+                    i = order[b]
+                    if not alive[i] or owners[i] == owner:
+                        continue
+                    dx = xs[i] - sx
+                    dy = ys[i] - sy
+                    dist_sq = dx * dx + dy * dy
+                    # Strictly closer only, so ties go to the lowest slot like argmin on the NumPy path.
+                    if dist_sq < best_dist_sq:
+                        best_dist_sq = dist_sq
+                        best = i
+                targets[seeker] = best
+
+    @njit(cache=True)
+    def advance_units(
+        xs: np.ndarray,
+        ys: np.ndarray,
+        cooldown: np.ndarray,
+        last_attack_tick: np.ndarray,
+        alive: np.ndarray,
+        targets: np.ndarray,
+        range_sq: np.ndarray,
+        move_speed: np.ndarray,
+        speed_scale: float,
+        attack_delay: int,
+        cooldown_step: int,
+        tick: int,
+        fired: np.ndarray,
+        moved: np.ndarray,
+    ) -> None:
+        """One tick of unit movement and attack timing; flags the units that fired or moved.
+
+        Every unit measures against its target's position from the start of the tick, so the
+        result does not depend on the order units are visited in.
+        """
+        start_x = xs.copy()
+        start_y = ys.copy()
+        for i in range(xs.shape[0]):
+            target = targets[i]
+            if not alive[i] or target < 0:
+                continue
+            dx = start_x[target] - start_x[i]
+            dy = start_y[target] - start_y[i]
+            dist_sq = dx * dx + dy * dy
+            if dist_sq <= range_sq[i]:
+                if cooldown[i] <= 0:
+                    cooldown[i] = attack_delay
+                    last_attack_tick[i] = tick
+                    fired[i] = True
+            else:
+                # Out of range implies a non-zero distance, so only moving units pay for the sqrt.
+                dist = math.sqrt(dist_sq)
+                step = min(move_speed[i] * speed_scale, dist)
+                xs[i] = start_x[i] + dx / dist * step
+                ys[i] = start_y[i] + dy / dist * step
+                moved[i] = True
+            if cooldown[i] > 0:
+                cooldown[i] -= cooldown_step
+
+    advance_bullets = njit(cache=True)(advance_bullets)
+
+    # Compile once at import so the first combat tick does not pay the JIT cost.
+    _xs = np.zeros(1)
+    _ids = np.zeros(1, dtype=np.int64)
+    _alive = np.zeros(1, dtype=np.bool_)
+    nearest_enemies(_xs, _xs, _ids, _alive, _ids, np.zeros(2, dtype=np.int64), _alive, _ids.copy())
+    advance_units(_xs, _xs, _ids, _ids, _alive, _ids, _xs, _xs, 1.0, 1, 1, 0, _alive, _alive)
+    _codes = np.zeros(1, dtype=np.int8)
+    advance_bullets(_xs, _xs, _ids, _xs, _ids, _ids, _alive, 0, _xs, _xs, _xs, _codes, _ids, _alive, 0, 1.0, 1.0, 1, 2)
+
+else:
+
+    def nearest_enemies(
+        xs: np.ndarray,
+        ys: np.ndarray,
+        owners: np.ndarray,
+        alive: np.ndarray,
+        order: np.ndarray,
+        bounds: np.ndarray,
+        stale: np.ndarray,
+        targets: np.ndarray,
+    ) -> None:
+        """Write each stale-group unit's closest live unit of another owner into targets; -1 where there is none.
+
+        order lists the slots grouped by match (ascending slot within a group) and group g spans
+        order[bounds[g]:bounds[g + 1]], so each seeker only scans its own match.
+        """
+        # Units only ever target within their own match, so each match gets its own distance matrix.
+        for group in np.flatnonzero(stale):
+            members = order[bounds[group] : bounds[group + 1]]
+            targets[members] = -1
+            members = members[alive[members]]
+            if not members.size:
+                continue
+            mx = xs[members]
+            my = ys[members]
+            mo = owners[members]
+            # Rows are seekers, columns candidates; a unit never targets its own side, itself included.
+            dx = mx[None, :] - mx[:, None]
+            dy = my[None, :] - my[:, None]
+            dist_sq = dx * dx + dy * dy
+            dist_sq[mo[:, None] == mo[None, :]] = np.inf
+            # argmin returns the first minimum, matching the strict comparison of the compiled scan.
+            best = np.argmin(dist_sq, axis=1)
+            found = np.isfinite(dist_sq[np.arange(members.size), best])
+            targets[members[found]] = members[best[found]]
+
+    def advance_units(
+        xs: np.ndarray,
+        ys: np.ndarray,
+        cooldown: np.ndarray,
+        last_attack_tick: np.ndarray,
+        alive: np.ndarray,
+        targets: np.ndarray,
+        range_sq: np.ndarray,
+        move_speed: np.ndarray,
+        speed_scale: float,
+        attack_delay: int,
+        cooldown_step: int,
+        tick: int,
+        fired: np.ndarray,
+        moved: np.ndarray,
+    ) -> None:
+        """One tick of unit movement and attack timing; flags the units that fired or moved.
+
+        Every unit measures against its target's position from the start of the tick, so the
+        result does not depend on the order units are visited in.
+        """
+        active = alive & (targets >= 0)
+        # Inactive rows index slot 0 as a placeholder; every write below is masked by active.
+        target = np.where(active, targets, 0)
+        dx = xs[target] - xs
+        dy = ys[target] - ys
+        dist_sq = dx * dx + dy * dy
+        in_range = active & (dist_sq <= range_sq)
+        fire = in_range & (cooldown <= 0)
+        cooldown[fire] = attack_delay
+        last_attack_tick[fire] = tick
+        fired |= fire
+        move = active & ~in_range
+        dist = np.sqrt(dist_sq[move])
+        step = np.minimum(move_speed[move] * speed_scale, dist)
+        xs[move] = xs[move] + dx[move] / dist * step
+        ys[move] = ys[move] + dy[move] / dist * step
+        moved |= move
+        cooldown[active & (cooldown > 0)] -= cooldown_step
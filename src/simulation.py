@@ -1,11 +1,14 @@
-import math
-import uuid
+import itertools
 from typing import Dict, List, Optional, Tuple
 
-from board import HexTile, build_board, find_tile, tile_lookup
+import numpy as np
+
+from board import ROW_MASK, SIDE_MASKS, HexTile, Side, load_board
 from config import (
     AI_OWNER_ID,
     ATTACK_DELAY_TICKS,
+    BENCH_ROWS,
+    BOARD_ROWS,
     BOARD_ROWS_PER_SIDE,
     BOARD_COLS,
     BULLET_HIT_RADIUS,
@@ -13,45 +16,252 @@ from config import (
     ACCEL_ATTACK_FACTOR,
     MELEE_RANGE_THRESHOLD,
     TICKS_PER_SECOND,
+    UNIT_RANGE_SQ,
     UNIT_STATS,
 )
+from sim_numba import advance_bullets, advance_units, nearest_enemies
+
+# Bullets travel at a fixed speed scaled to the server tick cadence.
+BULLET_SPEED = 10.0 * (60.0 / TICKS_PER_SECOND)
+# A bullet hits once it is within its hit radius or would overshoot on the next step.
+BULLET_HIT_DIST_SQ = max(BULLET_HIT_RADIUS, BULLET_SPEED) ** 2
+# Unit pass pacing as (speed scale, attack delay ticks, cooldown step per tick), fixed per combat phase.
+NORMAL_PACE = (1.0, ATTACK_DELAY_TICKS, 1)
+ACCELERATED_PACE = (
+    float(ACCEL_ATTACK_FACTOR),
+    max(1, int(ATTACK_DELAY_TICKS / ACCEL_ATTACK_FACTOR)),
+    ACCEL_ATTACK_FACTOR,
+)
+# Tiles per owner in the occupancy key space, bench rows included.
+TILE_COUNT = (BOARD_ROWS + BENCH_ROWS) * BOARD_COLS
+
+
+def occupancy_key(tile_index: int, owner_id: int) -> int:
+    """Packs (tile, owner) into one int; unique for any owner id, the negative AI owner included."""
+    return owner_id * TILE_COUNT + tile_index
+
+
+# Unit status as stored in UnitArrays.status_code; UnitState.status maps codes back to the wire strings.
+STATUS_BENCH = 0
+STATUS_BOARD = 1
+STATUS_DEAD = 2
+STATUS_NAMES = ("bench", "board", "dead")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+# match_id column value for units outside any match.
+NO_MATCH = -1
+
+# Unit ids start at 1 so a valid id is never falsy.
+_unit_ids = itertools.count(1)
+
+
+def next_unit_id() -> int:
+    return next(_unit_ids)
+
+
+class UnitArrays:
+    """Struct-of-arrays storage for per-unit combat state; live units occupy slots [0, count)."""
+
+    FIELDS = (
+        "pos_x",
+        "pos_y",
+        "hp",
+        "owner_id",
+        "match_id",
+        "status_code",
+        "move_speed",
+        "attack_range",
+        "attack_range_sq",
+        "damage",
+        "cooldown",
+        "last_attack_tick",
+    )
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.count = 0
+        self.pos_x = np.zeros(capacity)
+        self.pos_y = np.zeros(capacity)
+        self.hp = np.zeros(capacity)
+        self.owner_id = np.zeros(capacity, dtype=np.int64)
+        self.match_id = np.full(capacity, NO_MATCH, dtype=np.int64)
+        self.status_code = np.zeros(capacity, dtype=np.int8)
+        self.move_speed = np.zeros(capacity)
+        self.attack_range = np.zeros(capacity)
+        self.attack_range_sq = np.zeros(capacity)
+        self.damage = np.zeros(capacity)
+        self.cooldown = np.zeros(capacity, dtype=np.int64)
+        self.last_attack_tick = np.zeros(capacity, dtype=np.int64)
+
+    def allocate(self) -> int:
+        if self.count == self.pos_x.shape[0]:
+            self._grow()
+        slot = self.count
+        self.count += 1
+        return slot
+
+    def release(self, slot: int) -> int:
+        """Free a slot by moving the last live slot into it; returns the slot that was vacated."""
+        last = self.count - 1
+        if slot != last:
+            for name in self.FIELDS:
+                column = getattr(self, name)
+                column[slot] = column[last]
+        self.count = last
+        return last
+
+    def _grow(self) -> None:
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            grown = np.zeros(column.shape[0] * 2, dtype=column.dtype)
+            grown[: column.shape[0]] = column
+            setattr(self, name, grown)
 
 
 class UnitState:
-    def __init__(self, owner_id: int, unit_type: str) -> None:
+    """Identity and placement of a unit; its combat fields are a view onto one UnitArrays slot."""
+
+    __slots__ = (
+        "id",
+        "owner_id",
+        "unit_type",
+        "max_hp",
+        "damage",
+        "attack_range",
+        "attack_range_sq",
+        "move_speed",
+        "tile_id",
+        "home_tile_id",
+        "_store",
+        "slot",
+        "_payload",
+    )
+
+    def __init__(self, owner_id: int, unit_type: str, store: UnitArrays, slot: int) -> None:
         stats = UNIT_STATS[unit_type]
-        self.id = str(uuid.uuid4())
+        self.id = next_unit_id()
         self.owner_id = owner_id
         self.unit_type = unit_type
-        self.max_hp = float(stats["hp"])
-        self.hp = self.max_hp
-        self.damage = float(stats["dmg"])
-        self.attack_range = float(stats["range"])
+        self.max_hp = float(stats.hp)
+        # Fixed stats stay plain attributes for Python-side reads; the columns feed the array kernels.
+        self.damage = float(stats.dmg)
+        self.attack_range = float(stats.range)
+        self.attack_range_sq = UNIT_RANGE_SQ[unit_type]
         # Scale movement speed to the lower server tick rate (baseline 60fps).
-        self.move_speed = float(stats["speed"]) * (60.0 / TICKS_PER_SECOND)
-        self.status = "bench"  # bench | board | dead
+        self.move_speed = float(stats.speed) * (60.0 / TICKS_PER_SECOND)
         self.tile_id: Optional[str] = None
         self.home_tile_id: Optional[str] = None
+        self._store = store
+        self.slot = slot
+        store.owner_id[slot] = owner_id
+        store.damage[slot] = self.damage
+        store.attack_range[slot] = self.attack_range
+        store.attack_range_sq[slot] = self.attack_range_sq
+        store.move_speed[slot] = self.move_speed
+        self.hp = self.max_hp
+        self.status = "bench"  # bench | board | dead
         self.x = 0.0
         self.y = 0.0
         self.attack_cooldown = 0
         self.last_attack_tick = -1000
-        self.match_id: Optional[int] = None
+        self.match_id = None
+        # Last serialized form; rebuilt only after a field it carries has changed.
+        self._payload: Optional[Dict] = None
+
+    @property
+    def x(self) -> float:
+        return float(self._store.pos_x[self.slot])
+
+    @x.setter
+    def x(self, value: float) -> None:
+        self._store.pos_x[self.slot] = value
+
+    @property
+    def y(self) -> float:
+        return float(self._store.pos_y[self.slot])
+
+    @y.setter
+    def y(self, value: float) -> None:
+        self._store.pos_y[self.slot] = value
+
+    @property
+    def hp(self) -> float:
+        return float(self._store.hp[self.slot])
+
+    @hp.setter
+    def hp(self, value: float) -> None:
+        self._store.hp[self.slot] = value
+
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[self._store.status_code[self.slot]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._store.status_code[self.slot] = STATUS_CODES[value]
+
+    @property
+    def match_id(self) -> Optional[int]:
+        match_id = int(self._store.match_id[self.slot])
+        return None if match_id == NO_MATCH else match_id
+
+    @match_id.setter
+    def match_id(self, value: Optional[int]) -> None:
+        self._store.match_id[self.slot] = NO_MATCH if value is None else value
+
+    @property
+    def attack_cooldown(self) -> int:
+        return int(self._store.cooldown[self.slot])
+
+    @attack_cooldown.setter
+    def attack_cooldown(self, value: int) -> None:
+        self._store.cooldown[self.slot] = value
+
+    @property
+    def last_attack_tick(self) -> int:
+        return int(self._store.last_attack_tick[self.slot])
+
+    @last_attack_tick.setter
+    def last_attack_tick(self, value: int) -> None:
+        self._store.last_attack_tick[self.slot] = value
 
     def to_payload(self) -> Dict:
+        """Wire form of the unit; the dict is shared between calls, so treat it as read-only."""
+        if self._payload is None:
+            self._payload = self._build_payload(
+                self.hp, self.x, self.y, self.status, self.last_attack_tick, self.match_id
+            )
+        return self._payload
+
+    def invalidate_payload(self) -> None:
+        self._payload = None
+
+    def has_payload(self) -> bool:
+        return self._payload is not None
+
+    def set_payload_from_columns(
+        self, hp: float, x: float, y: float, status_code: int, attack_at: int, match_id: int
+    ) -> None:
+        """Cache the payload from raw UnitArrays values of this unit's slot, as read in bulk."""
+        self._payload = self._build_payload(
+            hp, x, y, STATUS_NAMES[status_code], attack_at, None if match_id == NO_MATCH else match_id
+        )
+
+    def _build_payload(
+        self, hp: float, x: float, y: float, status: str, attack_at: int, match_id: Optional[int]
+    ) -> Dict:
+        # Column-backed fields are passed in so set_payload_from_columns can supply them from bulk reads.
         return {
             "id": self.id,
             "owner": self.owner_id,
             "type": self.unit_type,
-            "hp": self.hp,
+            "hp": hp,
             "max_hp": self.max_hp,
-            "x": self.x,
-            "y": self.y,
-            "status": self.status,
+            "x": x,
+            "y": y,
+            "status": status,
             "tile_id": self.tile_id,
             "home_tile_id": self.home_tile_id,
-            "attack_at": self.last_attack_tick,
-            "match_id": self.match_id,
+            "attack_at": attack_at,
+            "match_id": match_id,
         }
 
     def reset_for_placement(self, tiles: Dict[str, HexTile]) -> None:
@@ -62,42 +272,114 @@ class UnitState:
         self.status = "board" if self.tile_id else "bench"
         self.attack_cooldown = 0
         self.last_attack_tick = -1000
+        self._payload = None
+
+
+class BulletArrays:
+    """Struct-of-arrays storage for bullets in flight; live bullets occupy [0, count) in spawn order."""
 
+    FIELDS = ("pos_x", "pos_y", "target_slot", "damage", "spawn_tick", "match_id", "visible")
 
-class BulletState:
-    def __init__(
+    def __init__(self, capacity: int = 256) -> None:
+        self.count = 0
+        self.pos_x = np.zeros(capacity)
+        self.pos_y = np.zeros(capacity)
+        # UnitArrays slot of the target; kept in step with the slot moves in BattleSimulation.remove_unit.
+        self.target_slot = np.zeros(capacity, dtype=np.int64)
+        self.damage = np.zeros(capacity)
+        self.spawn_tick = np.zeros(capacity, dtype=np.int64)
+        self.match_id = np.full(capacity, NO_MATCH, dtype=np.int64)
+        self.visible = np.zeros(capacity, dtype=np.bool_)
+
+    def spawn(
         self,
-        x: float,
-        y: float,
-        target_id: str,
-        damage: float,
-        spawn_tick: int,
-        match_id: Optional[int],
-        visible: bool,
+        pos_x: np.ndarray,
+        pos_y: np.ndarray,
+        target_slot: np.ndarray,
+        damage: np.ndarray,
+        tick: int,
+        match_id: np.ndarray,
+        visible: np.ndarray,
     ) -> None:
-        self.x = x
-        self.y = y
-        self.target_id = target_id
-        # Speed scaled to match server tick cadence.
-        self.speed = 10.0 * (60.0 / TICKS_PER_SECOND)
-        self.damage = damage
-        self.active = True
-        self.spawn_tick = spawn_tick
-        self.match_id = match_id
-        self.visible = visible
-
-    def to_payload(self) -> Dict:
-        return {"x": self.x, "y": self.y, "target": self.target_id, "match_id": self.match_id, "visible": self.visible}
+        """Append one bullet per row of the given columns, all fired on the same tick."""
+        start = self.count
+        end = start + pos_x.shape[0]
+        while end > self.pos_x.shape[0]:
+            self._grow()
+        self.pos_x[start:end] = pos_x
+        self.pos_y[start:end] = pos_y
+        self.target_slot[start:end] = target_slot
+        self.damage[start:end] = damage
+        self.spawn_tick[start:end] = tick
+        self.match_id[start:end] = match_id
+        self.visible[start:end] = visible
+        self.count = end
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def drop_target(self, slot: int, moved_from: int) -> None:
+        """Drop bullets aimed at a released unit slot, then retarget those aimed at the unit moved into it."""
+        count = self.count
+        keep = self.target_slot[:count] != slot
+        kept = int(np.count_nonzero(keep))
+        if kept != count:
+            for name in self.FIELDS:
+                column = getattr(self, name)
+                column[:kept] = column[:count][keep]
+            self.count = kept
+        targets = self.target_slot[:kept]
+        targets[targets == moved_from] = slot
+
+    def to_payload(self, slot_units: List["UnitState"]) -> List[Dict]:
+        count = self.count
+        columns = zip(
+            self.pos_x[:count].tolist(),
+            self.pos_y[:count].tolist(),
+            self.target_slot[:count].tolist(),
+            self.match_id[:count].tolist(),
+            self.visible[:count].tolist(),
+        )
+        return [
+            {
+                "x": x,
+                "y": y,
+                "target": slot_units[target].id,
+                "match_id": None if match_id == NO_MATCH else match_id,
+                "visible": visible,
+            }
+            for x, y, target, match_id, visible in columns
+        ]
+
+    def _grow(self) -> None:
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            grown = np.zeros(column.shape[0] * 2, dtype=column.dtype)
+            grown[: column.shape[0]] = column
+            setattr(self, name, grown)
 
 
 class BattleSimulation:
     def __init__(self) -> None:
-        self.tiles = build_board()
-        self.tile_map = tile_lookup(self.tiles)
-        self.units: Dict[str, UnitState] = {}
-        # key = f"{tile.id}:{owner_id}" to keep per-owner occupancy
-        self.tile_occupants: Dict[str, str] = {}
-        self.bullets: List[BulletState] = []
+        board = load_board()
+        self.tiles = list(board.tiles)
+        self.tile_map = board.by_id
+        self.tile_grid = board.by_rc
+        self.units: Dict[int, UnitState] = {}
+        # Combat fields of every unit, plus the unit occupying each live slot.
+        self.store = UnitArrays()
+        self.slot_units: List[UnitState] = []
+        # Slots grouped by match id plus group bounds, see match_groups(); None when stale.
+        self._match_groups: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        # Last tick's (order, alive, moved, targets), see tick_combat(); None at the start of each combat.
+        self._target_cache: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        # owner_id -> that owner's units in spawn order, kept in sync with units
+        self.units_by_owner: Dict[int, Dict[int, UnitState]] = {}
+        # key = occupancy_key(tile.index, owner_id) to keep per-owner occupancy
+        self.tile_occupants: Dict[int, int] = {}
+        # owner_id -> bitboard of occupied tiles, kept in sync with tile_occupants
+        self.occupied_bits: Dict[int, int] = {}
+        self.bullets = BulletArrays()
         self.phase = "placement"
         self.tick = 0
         self.pairs: List[Tuple[int, int]] = []
@@ -105,81 +387,116 @@ class BattleSimulation:
 
     # --- Unit and placement management ---
     def spawn_unit(self, owner_id: int, unit_type: str) -> UnitState:
-        unit = UnitState(owner_id, unit_type)
+        unit = UnitState(owner_id, unit_type, self.store, self.store.allocate())
         self.units[unit.id] = unit
+        self.slot_units.append(unit)
+        self._match_groups = None
+        self.units_by_owner.setdefault(owner_id, {})[unit.id] = unit
         return unit
 
     def place_unit_on_tile(
-        self, unit_id: str, row: int, col: int, allow_enemy: bool = False, allowed_side: Optional[str] = None
+        self, unit_id: int, row: int, col: int, allow_enemy: bool = False, allowed_side: Optional[Side] = None
     ) -> bool:
         unit = self.units.get(unit_id)
-        tile = find_tile(self.tiles, row, col)
+        tile = self.tile_grid.get((row, col))
         if not unit or not tile or tile.is_bench or self.phase != "placement":
             return False
-        if allowed_side and tile.side != allowed_side and not (allow_enemy and tile.side == "enemy"):
+        if allowed_side is not None and tile.side != allowed_side and not (allow_enemy and tile.side == Side.ENEMY):
             return False
-        occ_key = f"{tile.id}:{unit.owner_id}"
+        occ_key = occupancy_key(tile.index, unit.owner_id)
         occupant = self.tile_occupants.get(occ_key)
         if occupant and occupant != unit_id:
             return False
         # Release previous tile
         if unit.tile_id:
-            prev_key = f"{unit.tile_id}:{unit.owner_id}"
-            self.tile_occupants.pop(prev_key, None)
+            self.release_tile(unit.tile_id, unit.owner_id)
 
         unit.tile_id = tile.id
-        if tile.side == "friendly":
+        if tile.side == Side.FRIENDLY:
             unit.home_tile_id = tile.id
         unit.x, unit.y = tile.center
         unit.status = "board"
-        self.tile_occupants[occ_key] = unit.id
+        unit.invalidate_payload()
+        self.occupy_tile(tile, unit.owner_id, unit.id)
         return True
 
-    def move_unit_to_bench(self, unit_id: str) -> bool:
+    def move_unit_to_bench(self, unit_id: int) -> bool:
         unit = self.units.get(unit_id)
         if not unit:
             return False
         if unit.tile_id:
-            self.tile_occupants.pop(f"{unit.tile_id}:{unit.owner_id}", None)
+            self.release_tile(unit.tile_id, unit.owner_id)
         unit.tile_id = None
         unit.status = "bench"
         unit.x, unit.y = 0.0, 0.0
+        unit.invalidate_payload()
         return True
 
-    def remove_unit(self, unit_id: str) -> None:
+    def remove_unit(self, unit_id: int) -> None:
         unit = self.units.get(unit_id)
         if not unit:
             return
         if unit.tile_id:
-            self.tile_occupants.pop(f"{unit.tile_id}:{unit.owner_id}", None)
+            self.release_tile(unit.tile_id, unit.owner_id)
         self.units.pop(unit_id, None)
+        # Keep the slots dense: the last unit moves into the freed slot.
+        vacated = self.store.release(unit.slot)
+        if vacated != unit.slot:
+            mover = self.slot_units[vacated]
+            mover.slot = unit.slot
+            self.slot_units[unit.slot] = mover
+        self.slot_units.pop()
+        self.bullets.drop_target(unit.slot, vacated)
+        self._match_groups = None
+        owned = self.units_by_owner.get(unit.owner_id)
+        if owned is not None:
+            owned.pop(unit_id, None)
+            if not owned:
+                del self.units_by_owner[unit.owner_id]
+
+    def occupy_tile(self, tile: HexTile, owner_id: int, unit_id: int) -> None:
+        self.tile_occupants[occupancy_key(tile.index, owner_id)] = unit_id
+        self.occupied_bits[owner_id] = self.occupied_bits.get(owner_id, 0) | tile.bit
+
+    def release_tile(self, tile_id: str, owner_id: int) -> None:
+        tile = self.tile_map.get(tile_id)
+        if not tile:
+            return
+        self.tile_occupants.pop(occupancy_key(tile.index, owner_id), None)
+        if owner_id in self.occupied_bits:
+            self.occupied_bits[owner_id] &= ~tile.bit
 
-    def mirror_tile(self, tile: HexTile, to_side: str) -> Optional[HexTile]:
+    def clear_occupants(self) -> None:
+        self.tile_occupants.clear()
+        self.occupied_bits.clear()
+
+    def mirror_tile(self, tile: HexTile, to_side: Side) -> Optional[HexTile]:
         if tile.is_bench:
             return tile
-        if to_side == "enemy" and tile.side == "friendly":
+        if to_side == Side.ENEMY and tile.side == Side.FRIENDLY:
             enemy_row = BOARD_ROWS_PER_SIDE - 1 - (tile.row - BOARD_ROWS_PER_SIDE)
             enemy_col = (BOARD_COLS - 1) - tile.col
-            return find_tile(self.tiles, enemy_row, enemy_col)
-        if to_side == "friendly" and tile.side == "enemy":
+            return self.tile_grid.get((enemy_row, enemy_col))
+        if to_side == Side.FRIENDLY and tile.side == Side.ENEMY:
             friendly_row = BOARD_ROWS_PER_SIDE + (BOARD_ROWS_PER_SIDE - 1 - tile.row)
             friendly_col = (BOARD_COLS - 1) - tile.col
-            return find_tile(self.tiles, friendly_row, friendly_col)
+            return self.tile_grid.get((friendly_row, friendly_col))
         return tile
 
-    def move_owner_to_side(self, owner_id: int, side: str) -> None:
-        for unit in [u for u in self.units.values() if u.owner_id == owner_id]:
+    def move_owner_to_side(self, owner_id: int, side: Side) -> None:
+        # Placement moves never add or remove units, so the owner's index can be walked directly.
+        for unit in self.units_by_owner.get(owner_id, {}).values():
             if not unit.home_tile_id:
                 continue
             home_tile = self.tile_map.get(unit.home_tile_id)
             if not home_tile:
                 continue
             source_tile = home_tile
-            target_tile = self.mirror_tile(source_tile, side) if side != "friendly" else source_tile
+            target_tile = self.mirror_tile(source_tile, side) if side != Side.FRIENDLY else source_tile
             target_tile = target_tile or self.find_open_tile(side, owner_id)
             if not target_tile:
                 continue
-            occ_key = f"{target_tile.id}:{owner_id}"
+            occ_key = occupancy_key(target_tile.index, owner_id)
             if occ_key in self.tile_occupants and self.tile_occupants[occ_key] != unit.id:
                 alt_tile = self.find_open_tile(side, owner_id)
                 if alt_tile:
@@ -187,57 +504,65 @@ class BattleSimulation:
                 else:
                     continue
             if unit.tile_id:
-                self.tile_occupants.pop(f"{unit.tile_id}:{unit.owner_id}", None)
+                self.release_tile(unit.tile_id, unit.owner_id)
             unit.tile_id = target_tile.id
             unit.x, unit.y = target_tile.center
             unit.status = "board"
-            self.tile_occupants[f"{target_tile.id}:{owner_id}"] = unit.id
+            unit.invalidate_payload()
+            self.occupy_tile(target_tile, owner_id, unit.id)
 
     def restore_home_positions(self) -> None:
-        self.tile_occupants.clear()
+        self.clear_occupants()
+        self._match_groups = None
         for unit in self.units.values():
             unit.match_id = None
+            unit.invalidate_payload()
             if unit.home_tile_id and unit.home_tile_id in self.tile_map:
                 tile = self.tile_map[unit.home_tile_id]
                 unit.tile_id = tile.id
                 unit.x, unit.y = tile.center
                 unit.status = "board"
-                self.tile_occupants[f"{tile.id}:{unit.owner_id}"] = unit.id
+                self.occupy_tile(tile, unit.owner_id, unit.id)
             else:
                 if unit.tile_id:
-                    self.tile_occupants.pop(f"{unit.tile_id}:{unit.owner_id}", None)
+                    self.release_tile(unit.tile_id, unit.owner_id)
                 unit.tile_id = None
                 unit.status = "bench"
 
     def prepare_pairs(self, pairs: List[Tuple[int, int]]) -> None:
         self.pairs = pairs
-        self.tile_occupants.clear()
+        self._match_groups = None
+        self.clear_occupants()
         paired_ids = {pid for pair in pairs for pid in pair}
         for pair_id, (bottom, top) in enumerate(pairs):
-            self.move_owner_to_side(bottom, "friendly")
-            self.move_owner_to_side(top, "enemy")
-            for unit in self.units.values():
-                if unit.owner_id in (bottom, top):
+            self.move_owner_to_side(bottom, Side.FRIENDLY)
+            self.move_owner_to_side(top, Side.ENEMY)
+            for owner_id in (bottom, top):
+                for unit in self.units_by_owner.get(owner_id, {}).values():
                     unit.match_id = pair_id
+                    unit.invalidate_payload()
         for unit in self.units.values():
             if unit.owner_id not in paired_ids and unit.tile_id:
                 self.move_unit_to_bench(unit.id)
                 unit.match_id = None
 
-    def find_open_tile(self, side: str, owner_id: int) -> Optional[HexTile]:
-        candidates = [t for t in self.tiles if not t.is_bench and t.side == side]
-        candidates.sort(key=lambda t: t.row, reverse=(side == "friendly"))
-        for tile in candidates:
-            occ_key = f"{tile.id}:{owner_id}"
-            if occ_key not in self.tile_occupants:
-                return tile
-        return None
+    def find_open_tile(self, side: Side, owner_id: int) -> Optional[HexTile]:
+        free = SIDE_MASKS.get(side, 0) & ~self.occupied_bits.get(owner_id, 0)
+        if not free:
+            return None
+        if side == Side.FRIENDLY:
+            # Prefer the back row (highest row), then the lowest column within it.
+            row = (free.bit_length() - 1) // BOARD_COLS
+            free &= ROW_MASK << (row * BOARD_COLS)
+        # Bit index equals the tile's position in the row-major tile list.
+        return self.tiles[(free & -free).bit_length() - 1]
 
     # --- Combat loop ---
     def start_combat(self) -> None:
         self.phase = "combat"
         self.tick = 0
         self.bullets.clear()
+        self._target_cache = None
         self.accelerated = False
         for unit in self.units.values():
             unit.reset_for_placement(self.tile_map)
@@ -252,49 +577,69 @@ class BattleSimulation:
                 unit.status = "board"
                 unit.attack_cooldown = 0
                 unit.hp = unit.max_hp
+                unit.invalidate_payload()
                 if unit.tile_id and unit.tile_id in self.tile_map:
                     tile = self.tile_map[unit.tile_id]
                     unit.x, unit.y = tile.center
 
-    def find_target(self, seeker: UnitState) -> Optional[UnitState]:
-        candidate: Optional[UnitState] = None
-        min_dist = float("inf")
-        for unit in self.units.values():
-            if (
-                unit.owner_id == seeker.owner_id
-                or unit.status != "board"
-                or unit.hp <= 0
-                or unit.match_id != seeker.match_id
-            ):
-                continue
-            dist = math.hypot(unit.x - seeker.x, unit.y - seeker.y)
-            if dist < min_dist:
-                min_dist = dist
-                candidate = unit
-        return candidate
+    def alive_mask(self) -> np.ndarray:
+        """Per-slot flag for units that can act or be targeted: on the board with HP left."""
+        store = self.store
+        count = store.count
+        return (store.status_code[:count] == STATUS_BOARD) & (store.hp[:count] > 0)
+
+    def match_groups(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Slots ordered by match id, ascending within each match, and the [start, end) bounds per match.
+
+        Match ids only change in prepare_pairs and restore_home_positions, and slots only move on spawn
+        and removal, so the partition is rebuilt lazily after those rather than every tick.
+        """
+        if self._match_groups is None:
+            count = self.store.count
+            match_id = self.store.match_id[:count]
+            order = np.argsort(match_id, kind="stable")
+            sorted_ids = match_id[order]
+            starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+            self._match_groups = (order, np.append(starts, count))
+        return self._match_groups
 
     def is_combat_resolved(self) -> bool:
-        snapshots = self.match_snapshots()
-        if not snapshots:
+        """True once every match has at most one owner with live units left; False with no matches."""
+        store = self.store
+        count = store.count
+        match_id = store.match_id[:count]
+        order, _ = self.match_groups()
+        # NO_MATCH sorts first, so matched slots are a suffix of the partition.
+        order = order[np.searchsorted(match_id[order], NO_MATCH, side="right") :]
+        if not order.size:
             return False
-        for snap in snapshots.values():
-            if len(snap["alive"]) > 1:
-                return False
-        return True
+        live = order[self.alive_mask()[order]]
+        # Within a match's run of live slots, two owners must sit next to each other somewhere.
+        same_match = match_id[live[1:]] == match_id[live[:-1]]
+        owners = store.owner_id[live]
+        return not np.any(same_match & (owners[1:] != owners[:-1]))
 
     def match_snapshots(self) -> Dict[int, Dict]:
         snapshots: Dict[int, Dict] = {}
-        for u in self.units.values():
-            if u.match_id is None:
+        store = self.store
+        count = store.count
+        columns = zip(
+            store.match_id[:count].tolist(),
+            store.owner_id[:count].tolist(),
+            store.status_code[:count].tolist(),
+            store.hp[:count].tolist(),
+        )
+        for match_id, owner_id, status_code, hp in columns:
+            if match_id == NO_MATCH:
                 continue
-            snap = snapshots.setdefault(u.match_id, {"alive": set(), "hp_totals": {}, "participants": set()})
-            snap["participants"].add(u.owner_id)
+            snap = snapshots.setdefault(match_id, {"alive": set(), "hp_totals": {}, "participants": set()})
+            snap["participants"].add(owner_id)
             # Only board units with HP contribute to win condition and timeout tiebreak.
-            if u.status == "board" and u.hp > 0:
-                snap["alive"].add(u.owner_id)
-                snap["hp_totals"][u.owner_id] = snap["hp_totals"].get(u.owner_id, 0) + max(u.hp, 0)
+            if status_code == STATUS_BOARD and hp > 0:
+                snap["alive"].add(owner_id)
+                snap["hp_totals"][owner_id] = snap["hp_totals"].get(owner_id, 0) + max(hp, 0)
             else:
-                snap["hp_totals"].setdefault(u.owner_id, 0)
+                snap["hp_totals"].setdefault(owner_id, 0)
         return snapshots
 
     def tick_combat(self) -> None:
@@ -302,72 +647,126 @@ class BattleSimulation:
             return
 
         self.tick += 1
-        # Update units
-        for unit in list(self.units.values()):
-            if unit.status != "board" or unit.hp <= 0:
-                continue
-
-            target = self.find_target(unit)
-            if not target:
-                continue
-
-            dist = math.hypot(target.x - unit.x, target.y - unit.y)
-            if dist <= unit.attack_range:
-                if unit.attack_cooldown <= 0:
-                    delay = ATTACK_DELAY_TICKS
-                    if self.accelerated:
-                        delay = max(1, int(delay / ACCEL_ATTACK_FACTOR))
-                    unit.attack_cooldown = delay
-                    unit.last_attack_tick = self.tick
-                    visible = unit.attack_range > MELEE_RANGE_THRESHOLD
-                    self.bullets.append(
-                        BulletState(unit.x, unit.y, target.id, unit.damage, self.tick, unit.match_id, visible)
-                    )
-            else:
-                if dist != 0:
-                    speed = unit.move_speed * (ACCEL_ATTACK_FACTOR if self.accelerated else 1)
-                    step = min(speed, dist)
-                    unit.x += (target.x - unit.x) / dist * step
-                    unit.y += (target.y - unit.y) / dist * step
-
-            if unit.attack_cooldown > 0:
-                decrement = ACCEL_ATTACK_FACTOR if self.accelerated else 1
-                unit.attack_cooldown -= decrement
-
-        # Update bullets
-        for bullet in list(self.bullets):
-            target = self.units.get(bullet.target_id)
-            if not target or target.hp <= 0:
-                bullet.active = False
-                continue
-            if target.match_id != bullet.match_id:
-                bullet.active = False
-                continue
-            if self.tick - bullet.spawn_tick > BULLET_TTL_TICKS:
-                bullet.active = False
-                continue
-
-            dx = target.x - bullet.x
-            dy = target.y - bullet.y
-            dist = math.hypot(dx, dy)
-            if dist <= max(BULLET_HIT_RADIUS, bullet.speed):
-                target.hp -= bullet.damage
-                bullet.active = False
-                if target.hp <= 0:
-                    target.status = "dead"
-            else:
-                step = min(bullet.speed, dist)
-                bullet.x += (dx / dist) * step
-                bullet.y += (dy / dist) * step
-
-        self.bullets = [b for b in self.bullets if b.active]
+        store = self.store
+        count = store.count
+        # No units means no bullets either: remove_unit drops the bullets aimed at a removed unit.
+        if not count:
+            return
+        # Views over the live slots; writes land straight in the store.
+        pos_x = store.pos_x[:count]
+        pos_y = store.pos_y[:count]
+        hp = store.hp[:count]
+        cooldown = store.cooldown[:count]
+        # HP and status only change in the bullet pass, so the mask holds for the whole unit pass.
+        alive = self.alive_mask()
+        # Every unit picks its target from the positions at the start of the tick, independent of unit order.
+        order, bounds = self.match_groups()
+        cache = self._target_cache
+        if cache is None or cache[0] is not order:
+            # New combat or slots moved since the last search: search every match.
+            targets = np.empty(count, dtype=np.int64)
+            stale = np.ones(bounds.shape[0] - 1, dtype=np.bool_)
+        else:
+            # A match's targets only change once one of its units moved, fell or left the board.
+            _, last_alive, last_moved, targets = cache
+            changed = last_moved | (alive != last_alive)
+            stale = np.logical_or.reduceat(changed[order], bounds[:-1])
+        nearest_enemies(pos_x, pos_y, store.owner_id[:count], alive, order, bounds, stale, targets)
+        slot_units = self.slot_units
+        # Update units: movement and attack timing run as one compiled pass over the columns.
+        fired = np.zeros(count, dtype=np.bool_)
+        moved = np.zeros(count, dtype=np.bool_)
+        speed_scale, attack_delay, cooldown_step = ACCELERATED_PACE if self.accelerated else NORMAL_PACE
+        advance_units(
+            pos_x,
+            pos_y,
+            cooldown,
+            store.last_attack_tick[:count],
+            alive,
+            targets,
+            store.attack_range_sq[:count],
+            store.move_speed[:count],
+            speed_scale,
+            attack_delay,
+            cooldown_step,
+            self.tick,
+            fired,
+            moved,
+        )
+        self._target_cache = (order, alive, moved, targets)
+        # Units that fired, moved or get hit below need a fresh payload.
+        changed = fired | moved
+        bullets = self.bullets
+        shooters = np.flatnonzero(fired)
+        if shooters.size:
+            # Shots are queued in slot order, the order the pass took them in.
+            bullets.spawn(
+                pos_x[shooters],
+                pos_y[shooters],
+                targets[shooters],
+                store.damage[shooters],
+                self.tick,
+                store.match_id[shooters],
+                store.attack_range[shooters] > MELEE_RANGE_THRESHOLD,
+            )
+
+        # Update bullets; survivors stay packed at the front in spawn order.
+        if bullets.count:
+            bullets.count = advance_bullets(
+                bullets.pos_x,
+                bullets.pos_y,
+                bullets.target_slot,
+                bullets.damage,
+                bullets.spawn_tick,
+                bullets.match_id,
+                bullets.visible,
+                bullets.count,
+                pos_x,
+                pos_y,
+                hp,
+                store.status_code[:count],
+                store.match_id[:count],
+                changed,
+                self.tick,
+                BULLET_SPEED,
+                BULLET_HIT_DIST_SQ,
+                BULLET_TTL_TICKS,
+                STATUS_DEAD,
+            )
+        for index in np.flatnonzero(changed).tolist():
+            slot_units[index].invalidate_payload()
 
     # --- Serialization helpers ---
     def as_payload(self) -> Dict:
-        return {
-            "phase": self.phase,
-            "tick": self.tick,
-            "units": [u.to_payload() for u in self.units.values()],
-            "bullets": [b.to_payload() for b in self.bullets],
-            "pairs": [{"match_id": idx, "bottom": b, "top": t} for idx, (b, t) in enumerate(self.pairs)],
-        }
+        payload: Dict = {}
+        self.fill_payload(payload)
+        return payload
+
+    def refresh_payloads(self) -> None:
+        """Rebuild every stale unit payload from one gather per column instead of per-unit scalar reads."""
+        stale = [u for u in self.units.values() if not u.has_payload()]
+        if not stale:
+            return
+        store = self.store
+        slots = np.fromiter((u.slot for u in stale), dtype=np.int64, count=len(stale))
+        columns = zip(
+            stale,
+            store.hp[slots].tolist(),
+            store.pos_x[slots].tolist(),
+            store.pos_y[slots].tolist(),
+            store.status_code[slots].tolist(),
+            store.last_attack_tick[slots].tolist(),
+            store.match_id[slots].tolist(),
+        )
+        for unit, hp, x, y, status_code, attack_at, match_id in columns:
+            unit.set_payload_from_columns(hp, x, y, status_code, attack_at, match_id)
+
+    def fill_payload(self, payload: Dict) -> None:
+        """Write the simulation fields into an existing message dict."""
+        payload["phase"] = self.phase
+        payload["tick"] = self.tick
+        # Unit dicts are reused until the unit changes, so unchanged units cost no allocation.
+        self.refresh_payloads()
+        payload["units"] = [u.to_payload() for u in self.units.values()]
+        payload["bullets"] = self.bullets.to_payload(self.slot_units)
+        payload["pairs"] = [{"match_id": idx, "bottom": b, "top": t} for idx, (b, t) in enumerate(self.pairs)]